@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Measures the regular expression work done for channel messages, the triggers
+looked for in everything said and the hostmasks checked when a nick is
+looked up, compared with building and compiling the expressions every time
+as was done before.
+
+Run from the top of the repository:
+python3 benchmarks/channelMessages.py
+'''
+
+import re
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from snowboard import regexCache
+from snowboard import scripts
+
+lineCount = 100000
+maskCount = 50
+lookupCount = 2000
+
+botnick = "Snowboard"
+
+# Everyday chatter, none of which sets off a trigger.
+sample = [
+    ":Nick1!user@host.example.com PRIVMSG #channel :hello there, how is everyone today?",
+    ":Nick2!other@10.0.0.2 PRIVMSG #channel :not much, just working on a few things",
+    ":Nick3!third@host3.example.org PRIVMSG #channel :Snowboard is quiet today",
+    ":Nick4!fourth@host4.example.net PRIVMSG #channel :pinging the server later"
+]
+
+class Net:
+    '''Just enough of a network for the triggers.'''
+    def __init__(self):
+        self.botnick = botnick
+
+class Message:
+    '''Just enough of an ircMessage for the triggers.'''
+    def __init__(self, net, data):
+        self.net = net
+        self.data = data
+        self.dataList = data.split()
+
+def corpus():
+    '''The text of each line, with the prefix and command removed.'''
+    lines = []
+    while len(lines) < lineCount:
+        lines += sample
+
+    return [line.split(" :", 1)[1] for line in lines[:lineCount]]
+
+def masks():
+    '''Hostmasks like the ones stored for users.'''
+    return ["user" + str(index) + "!*@*.example" + str(index) + ".com" for index in range(maskCount)]
+
+def convertWild(search):
+    '''The old wildcard conversion.'''
+    new = search.replace('.', r"\.")
+    new = new.replace('?', ".?")
+    new = new.replace('*', ".*")
+    return new
+
+def runLegacyLines(lines):
+    '''Times the old trigger checks, every regex built for every line.'''
+    net = Net()
+    found = 0
+
+    start = time.perf_counter()
+    for line in lines:
+        message = ":Nick1!user@host PRIVMSG #channel :" + line
+
+        # Seen triggers.
+        searchA = re.compile(r"^(.*)!(.*@.*) (PRIVMSG|PART) (#.*) :(.*)$", re.IGNORECASE)
+        searchB = re.compile(r"^(.*)!(.*@.*) (QUIT|NICK) :(.*)$", re.IGNORECASE)
+        searchC = re.compile(r"^(.*)!(.*@.*) (JOIN|PART) (#.*)$", re.IGNORECASE)
+        if searchA.match(message):
+            data = searchA.split(message)
+        elif searchB.match(message) or searchC.match(message):
+            data = None
+
+        # Basic channel triggers.
+        whoAreRE = r"^\b(" + net.botnick + r")(, | |: ){0,1}\b(Who are you)\?{0,1}$"
+        pingRE = r"^(ping)[ ]{0,1}(me){0,1}[,]{0,1}[ ]{0,1}(please){0,1}[?!.]{0,1}$"
+        if re.search(whoAreRE, line, flags = re.IGNORECASE) or re.search(pingRE, line, flags = re.IGNORECASE):
+            found += 1
+
+    return found, time.perf_counter() - start
+
+def runCachedLines(lines):
+    '''Times the channel triggers as they are now.'''
+    net = Net()
+    found = 0
+
+    start = time.perf_counter()
+    for line in lines:
+        found += len(scripts.channelTriggers.run(Message(net, line)))
+
+    return found, time.perf_counter() - start
+
+def runLegacyMasks(maskList):
+    '''Times the old hostmask matching, every mask compiled every time.'''
+    found = 0
+
+    start = time.perf_counter()
+    for index in range(lookupCount):
+        number = str(index % maskCount)
+        host = "user" + number + "!ident@shell.example" + number + ".com"
+        for mask in maskList:
+            if re.search(convertWild(mask), host, flags = re.IGNORECASE):
+                found += 1
+
+    return found, time.perf_counter() - start
+
+def runCachedMasks(maskList):
+    '''Times hostmask matching through the regex cache.'''
+    found = 0
+
+    start = time.perf_counter()
+    for index in range(lookupCount):
+        number = str(index % maskCount)
+        host = "user" + number + "!ident@shell.example" + number + ".com"
+        for mask in maskList:
+            if regexCache.wildcard(mask).search(host):
+                found += 1
+
+    return found, time.perf_counter() - start
+
+def report(name, count, elapsed):
+    '''Prints a single result line.'''
+    print(name.ljust(10) + str(count) + " matched in " + str(round(elapsed, 4)) + "s")
+
+def main():
+    lines = corpus()
+    print("Checking " + str(len(lines)) + " channel messages for triggers.")
+    report("before", *runLegacyLines(lines))
+    report("after", *runCachedLines(lines))
+
+    maskList = masks()
+    print("Matching " + str(lookupCount) + " nicks against " + str(maskCount) + " hostmasks.")
+    report("before", *runLegacyMasks(maskList))
+    report("after", *runCachedMasks(maskList))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
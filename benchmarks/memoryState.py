@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Measures the memory held for the nicks the bot can see and their places in
+its channels, compared with the old objects, each with a dictionary of
+attributes and each nick with an empty User of its own.
+
+Run from the top of the repository:
+python3 benchmarks/memoryState.py
+'''
+
+import os
+import sys
+import tempfile
+import tracemalloc
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from snowboard.channel import Channel
+from snowboard.channelPriv import ChannelPriv
+from snowboard.nick import Nick
+from snowboard.nickRegistry import NickRegistry
+
+nickCount = 50000
+channelCount = 20
+channelsEach = 2      # How many channels every nick is in
+knownEvery = 100      # One nick in this many belongs to a known user
+
+class LegacyFlags:
+    def __init__(self):
+        self.approved = []
+        self.denied = []
+
+class LegacyUser:
+    def __init__(self):
+        self.uid = None
+        self.user = None
+        self.pwHash = None
+        self.hostmasks = []
+        self.level = 0
+        self.flags = LegacyFlags()
+        self.channels = []
+
+class LegacyPriv:
+    def __init__(self, isop = False, isvoice = False):
+        self.op = isop
+        self.voice = isvoice
+
+class LegacyNick:
+    def __init__(self, nick, users):
+        self.name = nick
+        self.host = None
+        self.account = None
+        self.away = False
+        self.user = LegacyUser()
+        self.users = users
+        self.authed = False
+        self.openWHO = False
+        self.pingOut = 0
+        self.pingDest = None
+        self.sharedChannels = 0
+
+def nickNames():
+    '''The nicks seen, with their hosts.'''
+    names = []
+
+    for index in range(nickCount):
+        names.append(("Nick" + str(index), "user" + str(index) + "@host" + str(index) + ".example.com"))
+
+    return names
+
+def runLegacy(names):
+    '''Builds the state the way it was kept before.'''
+    nicks = {}
+    channels = []
+    for index in range(channelCount):
+        channels.append({})
+
+    tracemalloc.start()
+    for index, (name, host) in enumerate(names):
+        nick = LegacyNick(name, None)
+        nick.host = host
+        if index % knownEvery == 0:
+            nick.user.uid = index
+        nicks[name.lower()] = nick
+
+        for offset in range(channelsEach):
+            members = channels[(index + offset) % channelCount]
+            members[name.lower()] = [nick, LegacyPriv(index % 50 == 0, index % 10 == 0)]
+            nick.sharedChannels += 1
+
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return size
+
+def runSlots(names):
+    '''Builds the same state with the current objects.'''
+    nicks = NickRegistry()
+    channels = []
+    for index in range(channelCount):
+        channels.append(Channel("#channel" + str(index), "benchmark", nicks.fold))
+
+    tracemalloc.start()
+    for index, (name, host) in enumerate(names):
+        nick = Nick(name, None)
+        nick.host = host
+        if index % knownEvery == 0:
+            nick.setUID(index)
+        nicks.add(nick)
+
+        for offset in range(channelsEach):
+            chan = channels[(index + offset) % channelCount]
+            if chan.addNick(nick, ChannelPriv(index % 50 == 0, index % 10 == 0)):
+                nicks.joined(nick)
+
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return size
+
+def report(name, size):
+    '''Prints a single result line.'''
+    print(name.ljust(10) + str(round(size / 1048576, 2)) + " MiB, " +
+          str(round(size / nickCount)) + " bytes a nick")
+
+def main():
+    names = nickNames()
+    print(str(nickCount) + " nicks, each in " + str(channelsEach) + " of " + str(channelCount) +
+          " channels.")
+
+    # Channels keep a database in the working directory.
+    os.chdir(tempfile.mkdtemp())
+
+    report("before", runLegacy(names))
+    report("after", runSlots(names))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Measures handling a stream of server lines the old way (every part of the
+bot splitting the raw line for itself) compared with parsing each line once
+into a ServerMessage.
+
+The corpus is synthetic, not recorded traffic.  It is eight made up lines in
+the shapes a busy channel sends, messages, WHO and NAMES replies, joins,
+quits, a tagged line and a PING, repeated to make up the count.
+
+Run from the top of the repository:
+python3 benchmarks/parseMessages.py
+'''
+
+import re
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from snowboard.serverMessage import ServerMessage
+
+lineCount = 200000
+
+# Made up lines in the shapes a server sends, repeated to make up the corpus.
+sample = [
+    ":Nick1!user@host.example.com PRIVMSG #channel :hello there, how is everyone today?",
+    ":Nick2!other@10.0.0.2 PRIVMSG #channel :!seen Nick1",
+    ":irc.example.com 352 Bot #channel user host.example.com irc.example.com Nick1 H :0 Real Name",
+    ":irc.example.com 353 Bot = #channel :@Nick1 +Nick2 Nick3 Nick4 Nick5 Nick6 Nick7",
+    ":Nick3!user3@host3.example.com JOIN #channel",
+    "@time=2024-01-01T12:00:00.000Z;account=nick4 :Nick4!u@h PRIVMSG #channel :tagged line",
+    ":Nick5!user5@host5 QUIT :Ping timeout: 240 seconds",
+    "PING :irc.example.com"
+]
+
+def corpus():
+    '''Lines as they would come from the connection, prefix still on.'''
+    lines = []
+    while len(lines) < lineCount:
+        lines += sample
+
+    return lines[:lineCount]
+
+def runLegacy(lines):
+    '''
+    Times the old way, the prefix stripped by the connection and then the
+    line split again by the ping check, the logs, the dispatcher, the command
+    lookup and the message itself, with the seen triggers trying their
+    regular expressions over the whole line.
+    '''
+    handled = 0
+
+    start = time.perf_counter()
+    for line in lines:
+        if line[0] == ":":
+            line = line[1:]
+
+        # Ping check.
+        words = line.split()
+        if words[0] == "PING":
+            handled += 1
+            continue
+
+        # Logs.
+        msgList = line.split()
+        if len(msgList) > 2 and msgList[2][0] == "#":
+            data = " ".join(msgList[3:]).lstrip(":")
+
+        # Dispatcher.
+        command = line.split()[1]
+
+        # Command lookup, and the message splitting its own text.
+        msgList = line.split()
+        if len(msgList) > 3:
+            src = msgList[0].split("!")
+            text = " ".join(msgList[3:]).lstrip(":")
+            dataList = text.split()
+
+        # Seen triggers.
+        searchA = re.compile(r"^(.*)!(.*@.*) (PRIVMSG|PART) (#.*) :(.*)$", re.IGNORECASE)
+        searchB = re.compile(r"^(.*)!(.*@.*) (QUIT|NICK) :(.*)$", re.IGNORECASE)
+        searchC = re.compile(r"^(.*)!(.*@.*) (JOIN|PART) (#.*)$", re.IGNORECASE)
+        if searchA.match(line):
+            data = searchA.split(line)
+        elif searchB.match(line):
+            data = searchB.split(line)
+        elif searchC.match(line):
+            data = searchC.split(line)
+        else:
+            msgList = line.split()
+
+        handled += 1
+
+    return handled, time.perf_counter() - start
+
+def runParsed(lines):
+    '''Times parsing each line once, every part reading the same message.'''
+    handled = 0
+
+    start = time.perf_counter()
+    for line in lines:
+        message = ServerMessage.parse(line)
+
+        if message.command == "PING":
+            handled += 1
+            continue
+
+        command = message.command
+        if len(message.params) > 1:
+            text = message.text(1)
+        if message.param(0).startswith("#"):
+            data = message.text(1)
+        if command == "PRIVMSG":
+            dataList = message.param(1).split()
+        if command in ("PRIVMSG", "JOIN", "PART", "QUIT"):
+            nick = message.nick
+
+        handled += 1
+
+    return handled, time.perf_counter() - start
+
+def report(name, handled, elapsed):
+    '''Prints a single result line.'''
+    print(name.ljust(10) + str(handled) + " lines handled in " + str(round(elapsed, 4)) + "s")
+
+def main():
+    lines = corpus()
+    print("Handling " + str(len(lines)) + " server lines.")
+
+    report("before", *runLegacy(lines))
+    report("after", *runParsed(lines))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
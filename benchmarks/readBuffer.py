@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Measures how fast Connection.read pulls lines off a local socket pair,
+compared with the old one byte at a time reader.
+
+Run from the top of the repository:
+python3 benchmarks/readBuffer.py
+'''
+
+import select
+import socket
+import sys
+import threading
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from snowboard.connection import Connection
+from snowboard.server import Server
+
+lineCount = 50000
+
+def corpus():
+    '''Builds a burst of traffic like the one seen when joining a channel.'''
+    lines = []
+
+    for index in range(lineCount):
+        if index % 2:
+            lines.append(":irc.example.net 352 Snowboard #snowboard user" + str(index) +
+                         " host" + str(index) + ".example.com irc.example.net Nick" + str(index) +
+                         " H :0 Real Name " + str(index) + "\r\n")
+        else:
+            lines.append(":Nick" + str(index) + "!user@host" + str(index) +
+                         ".example.com PRIVMSG #snowboard :Hello there, this is line " + str(index) + "\r\n")
+
+    return "".join(lines).encode('utf-8')
+
+def feed(sock, data):
+    '''Sends the whole corpus down the socket, then hangs up.'''
+    sock.sendall(data)
+    sock.close()
+
+def legacyRead(sock):
+    '''The reader as it was, one recv(1) and one decode per byte.'''
+    received = ""
+
+    while True:
+        try:
+            data = sock.recv(1)
+        except BlockingIOError:
+            return None
+
+        if not data:
+            return False
+
+        text = data.decode('utf-8', 'replace')
+        if text == '\n':
+            return received.strip('\r')
+        else:
+            received += text
+
+def runLegacy(data):
+    '''Times the legacy reader over the corpus.'''
+    reader, writer = socket.socketpair()
+    reader.setblocking(False)
+    lines = 0
+
+    start = time.perf_counter()
+    thread = threading.Thread(target = feed, args = (writer, data))
+    thread.start()
+
+    while True:
+        line = legacyRead(reader)
+        if line is False:
+            break
+        elif line is None:
+            select.select([reader], [], [])
+        else:
+            lines += 1
+
+    elapsed = time.perf_counter() - start
+    thread.join()
+    reader.close()
+
+    return lines, elapsed
+
+def runBuffered(data):
+    '''Times the buffered Connection.read over the corpus.'''
+    reader, writer = socket.socketpair()
+    conn = Connection(Server("localhost", 0, False))
+    conn.attach(reader)
+    lines = 0
+
+    start = time.perf_counter()
+    thread = threading.Thread(target = feed, args = (writer, data))
+    thread.start()
+
+    while conn.connected():
+        line = conn.read()
+        if line is None:
+            if conn.connected():
+                select.select([reader], [], [])
+        else:
+            lines += 1
+
+    elapsed = time.perf_counter() - start
+    thread.join()
+
+    return lines, elapsed
+
+def report(name, data, lines, elapsed):
+    '''Prints a single result line.'''
+    rate = len(data) / elapsed / 1024 / 1024
+    print(name.ljust(10) + str(lines) + " lines in " + str(round(elapsed, 3)) + "s, " +
+          str(round(rate, 2)) + " MiB/s")
+
+def main():
+    data = corpus()
+    print("Reading " + str(len(data)) + " bytes over a local socket pair.")
+
+    lines, elapsed = runLegacy(data)
+    report("before", data, lines, elapsed)
+    lines, elapsed = runBuffered(data)
+    report("after", data, lines, elapsed)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Measures queueing and draining a burst of WHO lines, like the one sent after
+a large NAMES reply, compared with the old list based queue.
+
+Run from the top of the repository:
+python3 benchmarks/sendQueue.py
+'''
+
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from snowboard.sendQueue import SendQueue, laneFor
+
+nickCount = 10000
+blockSize = 6
+
+def corpus():
+    '''A WHO for every nick, every nick asked for twice.'''
+    commands = []
+
+    for index in range(nickCount):
+        commands.append("WHO Nick" + str(index))
+    for index in range(nickCount):
+        commands.append("WHO Nick" + str(index))
+
+    return commands
+
+def runLegacy(commands):
+    '''Times the queue as it was, a list searched for every WHO.'''
+    queue = []
+    sent = 0
+
+    start = time.perf_counter()
+    for command in commands:
+        if not command in queue:
+            queue.append(command)
+    queued = time.perf_counter() - start
+
+    while len(queue):
+        sent += len(queue[:blockSize])
+        queue = queue[blockSize:]
+
+    return sent, queued, time.perf_counter() - start
+
+def runSendQueue(commands):
+    '''Times SendQueue over the same commands.'''
+    queue = SendQueue()
+    now = time.time()
+    sent = 0
+
+    start = time.perf_counter()
+    for command in commands:
+        queue.push(command, laneFor(command), now)
+    queued = time.perf_counter() - start
+
+    while len(queue):
+        queue.pop()
+        sent += 1
+
+    return sent, queued, time.perf_counter() - start
+
+def report(name, sent, queued, elapsed):
+    '''Prints a single result line.'''
+    print(name.ljust(10) + str(sent) + " lines sent, queued in " + str(round(queued, 4)) +
+          "s, " + str(round(elapsed, 4)) + "s in all")
+
+def main():
+    commands = corpus()
+    print("Queueing " + str(len(commands)) + " WHO lines for " + str(nickCount) + " nicks.")
+
+    report("before", *runLegacy(commands))
+    report("after", *runSendQueue(commands))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
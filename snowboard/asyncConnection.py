@@ -0,0 +1,182 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Connection object for the asyncio runtime, built on asyncio streams.  It
+offers the same interface as Connection, except that connecting, reading and
+draining the output are coroutines.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import asyncio
+import socket
+import time
+
+from . import debug
+from .connection import createContext
+
+class AsyncConnection:
+    def __init__(self, srv):
+        self.host = srv.host
+        self.port = srv.port
+        self.__reader = None
+        self.__writer = None
+        self.__connected = False
+        self.ssl = srv.ssl
+        self.sslVerify = True
+        self.context = None        # SSL context, shared by the whole network
+        self.resumed = False       # If the TLS session was resumed
+        self.retries = 3           # Numbers of times to retry a connection
+        self.delay = 1             # Delay between connection attempts
+        self.timeout = 30          # How long a single attempt may take
+        self.elapsed = 0           # How long the successful attempt took
+        self.raceDelay = None      # Stagger for racing a host's addresses
+
+    def connected(self):
+        '''Returns the state of the connection.'''
+        return self.__connected
+
+    async def connect(self):
+        '''Connect to the configured server.'''
+        # Keep track of attempts.
+        attempt = 0
+
+        # Try until the connection succeeds or no more tries are left.
+        while (not self.__connected) and (attempt < self.retries):
+            # Attempt to establish a connection.
+            debug.message("Attempting connection to " + self.host + ":" + str(self.port) + ".")
+            start = time.time()
+            try:
+                if self.ssl and self.context is None:
+                    self.context = createContext(self.sslVerify)
+
+                # asyncio has no way to offer a saved session, so the handshake
+                # is always a full one, but the context is still shared.
+                if self.ssl:
+                    context = self.context
+                else:
+                    context = None
+
+                opening = asyncio.open_connection(self.host, self.port, ssl = context,
+                                                  happy_eyeballs_delay = self.raceDelay)
+                self.__reader, self.__writer = await asyncio.wait_for(opening, self.timeout)
+                self.__connected = True
+                self.elapsed = time.time() - start
+
+                sslObject = self.__writer.get_extra_info("ssl_object")
+                if not sslObject is None:
+                    self.resumed = sslObject.session_reused
+
+            # Assume connection errors are no big deal but do display an error.
+            except ConnectionAbortedError:
+                debug.error("Connection to " + self.host + " aborted by server.")
+            except ConnectionRefusedError:
+                debug.error("Connection to " + self.host + " refused by server.")
+            except (TimeoutError, asyncio.TimeoutError):
+                debug.error("Connection to " + self.host + " timed out.")
+            except socket.gaierror:
+                debug.error("Failed to resolve " + self.host + ".")
+            except OSError as err:
+                debug.error("Failed to connect '" + str(err.errno) + "' " + str(err.strerror) + ".")
+
+            attempt += 1
+
+            if not self.__connected:
+                await asyncio.sleep(self.delay)
+
+        return self.__connected
+
+    def disconnect(self):
+        '''Disconnect from the server.'''
+        debug.message("Disconnected from " + self.host + ":" + str(self.port) + ".")
+        if not self.__writer is None:
+            self.__writer.close()
+        self.__reader = None
+        self.__writer = None
+        self.__connected = False
+
+    async def drain(self):
+        '''Wait until the data written so far has been handed to the socket.'''
+        if self.__connected:
+            try:
+                await self.__writer.drain()
+            except OSError as err:
+                debug.error("Error #" + str(err.errno) + ": '" + str(err.strerror) + "' disconnecting.")
+                self.disconnect()
+
+    def flush(self):
+        '''The transport sends buffered data by itself, see drain().'''
+        return True
+
+    def getSocket(self):
+        '''The asyncio loop watches the socket itself, there is none to give.'''
+        return None
+
+    def outgoing(self):
+        '''The transport looks after its own output buffer.'''
+        return 0
+
+    def pending(self):
+        '''Lines are handed over as they arrive, nothing is left waiting.'''
+        return 0
+
+    async def read(self):
+        '''Wait for a line of data from the server.'''
+        received = None
+
+        while self.__connected and (received is None):
+            try:
+                data = await self.__reader.readline()
+            except (OSError, ValueError) as err:
+                debug.error("Error reading from the server: '" + str(err) + "' disconnecting.")
+                data = b''
+
+            # An empty read means the connection has been broken.
+            if not data:
+                self.disconnect()
+                break
+
+            # Remove the trailing carriage return character (cr/lf pair), the
+            # rest is left for the parser.
+            received = data.decode('utf-8', 'replace').rstrip('\r\n')
+
+            # Bug fix for Issue #18, do not return blank lines.
+            if received == "":
+                received = None
+
+        return received
+
+    def waiting(self):
+        '''Lines are handed over as they arrive, nothing is left waiting.'''
+        return False
+
+    def write(self, data):
+        '''Queues data to be sent to the server.'''
+        return self.writeLines([data])
+
+    def writeLines(self, lines):
+        '''Queues several lines to be sent to the server in one write.'''
+        if not self.__connected:
+            return False
+
+        data = bytearray()
+        for line in lines:
+            data += line.encode('utf-8')
+            data += b'\n'
+
+        self.__writer.write(data)
+
+        return True
@@ -19,24 +19,9 @@ Processes basic IRC commands.
 See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
 '''
 import time
-import re
 from . import debug
 from . import basicMessages
 
-def channelTriggers(ircMsg):
-    '''Process triggers for basic commands.'''
-    commands = []
-
-    whoAreRE = r"^\b(" + ircMsg.net.botnick + r")(, | |: ){0,1}\b(Who are you)\?{0,1}$"
-    pingRE = r"^(ping)[ ]{0,1}(me){0,1}[,]{0,1}[ ]{0,1}(please){0,1}[?!.]{0,1}$"
-
-    if re.search(whoAreRE, ircMsg.data, flags = re.IGNORECASE):
-        commands = __identifySelf(ircMsg)
-    elif re.search(pingRE, ircMsg.data, flags = re.IGNORECASE):
-        commands = __pingMe(ircMsg)
-
-    return commands
-
 def ctcpTriggers(ircMsg):
     '''Processes triggers for CTCP replies.'''
     commands = []
@@ -78,19 +63,6 @@ def joinTrigger(ircMsg):
 
     return commands
 
-def msgTriggers(ircMsg):
-    '''Process triggers for basic commands.'''
-    commands = []
-
-    if ircMsg.dataList[0].lower() == "quit":
-        commands = __quitCommand(ircMsg)
-    if ircMsg.dataList[0].lower() == "hop":
-        commands = __hopServers(ircMsg)
-    elif ircMsg.data.lower() == "who are you?":
-        commands = __identifySelf(ircMsg)
-
-    return commands
-
 def noticeTriggers(ircMsg):
     '''Process triggers for basic NOTICE commands'''
     commands = []
@@ -109,6 +81,15 @@ def noticeTriggers(ircMsg):
 
     return commands
 
+def registerTriggers(channel, private):
+    '''Declares the triggers for basic commands.'''
+    channel.addPattern(r"^\b({botnick})(, | |: ){0,1}\b(Who are you)\?{0,1}$", __identifySelf)
+    channel.addPattern(r"^(ping)[ ]{0,1}(me){0,1}[,]{0,1}[ ]{0,1}(please){0,1}[?!.]{0,1}$", __pingMe)
+
+    private.addCommand("quit", __quitCommand)
+    private.addCommand("hop", __hopServers)
+    private.addPattern(r"^who are you\?$", __identifySelf)
+
 def __acceptedNickServ(ircMsg):
     '''Provides handling for NickServ accepting the identify command.'''
     debug.message("I have confirmed my identity with " + ircMsg.src + ".")
@@ -155,7 +136,7 @@ def __identifySelf(ircMsg):
     '''The bot will send back identifying information.'''
     commands = []
 
-    if ircMsg.dest[0] == '#':
+    if ircMsg.net.isChannel(ircMsg.dest):
         dest = ircMsg.dest
         chan = ircMsg.net.findChannel(dest)
         botnick = chan.botnick
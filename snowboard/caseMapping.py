@@ -0,0 +1,44 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+How a server decides two nicks or channel names are the same, as given by
+the CASEMAPPING token in 005.  Under rfc1459, the default when a server does
+not say, []\~ are the upper case of {}|^, strict-rfc1459 leaves out ~ and ^,
+and ascii only folds the letters.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import string
+
+default = "rfc1459"
+
+tables = {
+    "ascii": str.maketrans(string.ascii_uppercase, string.ascii_lowercase),
+    "rfc1459": str.maketrans(string.ascii_uppercase + "[]\\~", string.ascii_lowercase + "{}|^"),
+    "strict-rfc1459": str.maketrans(string.ascii_uppercase + "[]\\", string.ascii_lowercase + "{}|")
+}
+
+def fold(name, table):
+    '''Returns a name folded to lower case with a table from tableFor().'''
+    return name.translate(table)
+
+def tableFor(mapping):
+    '''
+    Returns the table for a case mapping, the rfc1459 one for a mapping
+    that is not known.
+    '''
+    return tables.get(mapping.lower(), tables[default])
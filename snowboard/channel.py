@@ -22,10 +22,11 @@ See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
 
 from .users import Users
 from .channelDB import ChannelDB
+from .channelMember import ChannelMember
 
 class Channel:
     '''A class to store all information the bot knows about a channel.'''
-    def __init__(self, name, network, members = []):
+    def __init__(self, name, network, fold = str.lower):
         self.botnick = None
         self.db = ChannelDB(network, name)
         self.defaultModes = ""
@@ -34,13 +35,16 @@ class Channel:
         self.flags = []
         self.joined = False
         self.joinSent = False
+        self.fold = fold        # Folds a nick to lower case as the server does
         self.name = name
-        self.members = members  # A list of lists, storing Nick and ChanPriv
+        self.members = {}       # Folded nick to its ChannelMember
         self.modes = ""
         self.network = network
         self.topic = ""
         self.opped = False
         self.voiced = False
+        self.__ops = 0
+        self.__voices = 0
 
         self.loadData()
 
@@ -53,11 +57,15 @@ class Channel:
         self.saveData()
 
     def addNick(self, nick, priv):
-        '''Add a nick to the list.'''
-        existing = self.findNick(nick)
-        if existing is None:
-            member = [nick, priv]
-            self.members.append(member)
+        '''Add a nick to the list, returns True if it was not already there.'''
+        key = self.fold(nick.name)
+        if key in self.members:
+            return False
+
+        self.members[key] = ChannelMember(nick, priv)
+        self.__count(priv, 1)
+
+        return True
 
     def checkFlag(self, flag):
         '''Checks to see if a flag exists.'''
@@ -68,23 +76,30 @@ class Channel:
 
         return result
 
+    def clearNicks(self):
+        '''Forget everyone in the channel.'''
+        self.members.clear()
+        self.__ops = 0
+        self.__voices = 0
+
+    def countOps(self):
+        '''Returns how many people in the channel have ops.'''
+        return self.__ops
+
+    def countVoices(self):
+        '''Returns how many people in the channel have voice.'''
+        return self.__voices
+
     def findNick(self, nck):
         '''Find a nick in the list, if one exists.'''
-        result = None
-
         # The function should be able to find the information needed by
         # just a string or a Nick object.
-        if type(nck) == str:
-            nckStr = nck
+        if nck is None:
+            return None
+        elif type(nck) == str:
+            return self.members.get(self.fold(nck))
         else:
-            nckStr = nck.name
-
-        # Find the proper entry in members.
-        for member in self.members:
-            if member[0].name.lower() == nckStr.lower():
-                result = member
-
-        return result
+            return self.members.get(self.fold(nck.name))
 
     def join(self):
         '''Join a channel.'''
@@ -96,12 +111,24 @@ class Channel:
         '''Loads data into the object from the database.'''
         self.flags, self.defaultTopic, self.desc, self.defaultModes = self.db.loadData()
 
+    def memberList(self):
+        '''Returns the ChannelMember of everyone in the channel.'''
+        return list(self.members.values())
+
     def part(self):
         '''Leaves a channel.'''
         if self.joined:
             self.joinSent = False
             return ["PART " + self.name]
 
+    def reindex(self):
+        '''Index every nick again, once the way they are folded has changed.'''
+        members = list(self.members.values())
+        self.members.clear()
+
+        for member in members:
+            self.members[self.fold(member.nick.name)] = member
+
     def removeFlag(self, flag):
         '''Removes a flag from the channel and saves the DB.'''
         if flag.lower() in map(str.lower, self.flags):
@@ -110,20 +137,62 @@ class Channel:
         self.db.saveFlags(self.flags)
 
     def removeNick(self, nick):
-        '''Remove a nick from the list.'''
-        existing = self.findNick(nick)
+        '''Remove a nick from the list, returns True if it was there.'''
+        if type(nick) == str:
+            existing = self.members.pop(self.fold(nick), None)
+        else:
+            existing = self.members.pop(self.fold(nick.name), None)
+
+        if existing is None:
+            return False
+
+        self.__count(existing.priv, -1)
+
+        return True
+
+    def renameNick(self, oldName, nick):
+        '''Keep a nick that has changed its name indexed under the new one.'''
+        existing = self.members.pop(self.fold(oldName), None)
         if not existing is None:
-            self.members.remove(existing)
+            self.members[self.fold(nick.name)] = existing
 
     def saveData(self):
         '''Saves channel data to the database.'''
         self.db.saveData(self.flags, self.defaultTopic, self.desc, self.defaultModes)
 
+    def setOp(self, nick, op):
+        '''Give or take away ops for a nick in the channel.'''
+        existing = self.findNick(nick)
+        if (not existing is None) and (not existing.priv.op == op):
+            existing.priv.op = op
+            if op:
+                self.__ops += 1
+            else:
+                self.__ops -= 1
+
+    def setVoice(self, nick, voice):
+        '''Give or take away voice for a nick in the channel.'''
+        existing = self.findNick(nick)
+        if (not existing is None) and (not existing.priv.voice == voice):
+            existing.priv.voice = voice
+            if voice:
+                self.__voices += 1
+            else:
+                self.__voices -= 1
+
     def updateSelf(self):
         '''Update the bots knowledge of its own privileges.'''
         me = self.findNick(self.botnick)
 
-        self.opped = me[1].op
-        self.voiced = me[1].voice
+        if not me is None:
+            self.opped = me.priv.op
+            self.voiced = me.priv.voice
 
         self.loadData()
+
+    def __count(self, priv, change):
+        '''Keep the op and voice counts up to date as nicks come and go.'''
+        if priv.op:
+            self.__ops += change
+        if priv.voice:
+            self.__voices += change
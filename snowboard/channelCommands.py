@@ -23,6 +23,7 @@ norules
 nochans
 '''
 
+import asyncio
 import urllib.parse
 import urllib.request
 import urllib.error
@@ -32,35 +33,17 @@ from os.path import isfile
 from . import basicMessages
 from . import debug
 
-def channelTriggers(ircMsg):
-    '''Processes channel triggers for channel fucntions.'''
-    commands = []
-
-    if ircMsg.dataList[0] == "^opme":
-        commands = __opmeCommand(ircMsg)
-    elif ircMsg.dataList[0] == "^reset":
-        commands = __resetTopic(ircMsg)
-    elif ircMsg.dataList[0] == "^desc":
-        commands = __showDesc(ircMsg)
-    elif ircMsg.dataList[0] == "^rules":
-        __showRules(ircMsg)
-    elif ircMsg.dataList[0] == "^chans":
-        __showChans(ircMsg)
-    elif ircMsg.dataList[0] == "^w":
-        commands = __showWeather(ircMsg)
-    elif ircMsg.dataList[0] == "^button":
-        commands = __buttonPress(ircMsg)
-
-    return commands
+def registerTriggers(channel, private):
+    '''Declares the triggers for channel functions.'''
+    channel.addCommand("^opme", __opmeCommand)
+    channel.addCommand("^reset", __resetTopic)
+    channel.addCommand("^desc", __showDesc)
+    channel.addCommand("^rules", __showRules)
+    channel.addCommand("^chans", __showChans)
+    channel.addCommand("^w", __showWeather)
+    channel.addCommand("^button", __buttonPress)
 
-def msgTriggers(ircMsg):
-    '''Processes message triggers for channel functions.'''
-    commands = []
-
-    if ircMsg.dataList[0] == "modchan":
-        commands = __modChannel(ircMsg)
-
-    return commands
+    private.addCommand("modchan", __modChannel)
 
 def resetTopics(net):
     '''Resets all channel topics to default.'''
@@ -83,13 +66,13 @@ def __buttonPress(ircMsg):
 
     if (len(ircMsg.dataList) > 1) and (not chan.checkFlag("ic")):
         if ircMsg.dataList[1].lower() == "on":
-            if chanNick[1].op:
+            if chanNick.priv.op:
                 chan.removeFlag("nobutton")
                 commands.append("PRIVMSG " + ircMsg.dest + " :The button is now turned on.")
             else:
                 commands.append("PRIVMSG " + ircMsg.dest + " :You do not have ops in this channel.")
         elif ircMsg.dataList[1].lower() == "off":
-            if chanNick[1].op:
+            if chanNick.priv.op:
                 chan.addFlag("nobutton")
                 commands.append("PRIVMSG " + ircMsg.dest + " :The button is now turned off.")
             else:
@@ -283,10 +266,14 @@ def __showRules(ircMsg):
     if not chan.checkFlag("norules"):
         ircMsg.net.sendFile("help/rules.txt", "NOTICE", ircMsg.src)
 
-def __showWeather(ircMsg):
-    '''Shows the current weather by city.'''
+async def __showWeather(ircMsg):
+    '''
+    Shows the current weather by city.  Looking the weather up can take a
+    while, so the request runs in a worker thread and is awaited.
+    '''
     commands = []
     chan = ircMsg.net.findChannel(ircMsg.dest)
+    loop = asyncio.get_running_loop()
 
     if not chan.checkFlag("noweather") and len(ircMsg.dataList) > 0:
         city = " ".join(ircMsg.dataList[1:])
@@ -298,12 +285,13 @@ def __showWeather(ircMsg):
         debug.message(yql)
         debug.message(url)
         try:
-            response = urllib.request.urlopen(url)
+            response = await loop.run_in_executor(None, urllib.request.urlopen, url)
         except urllib.error.HTTPError as err:
             response = err
 
         if response.code == 200:
-            data = json.loads(response.read().decode('utf-8'))
+            body = await loop.run_in_executor(None, response.read)
+            data = json.loads(body.decode('utf-8'))
             if not data['query']['results'] is None:
                 locationData = data['query']['results']['channel']['location']
                 conditionData = data['query']['results']['channel']['item']['condition']
@@ -19,6 +19,8 @@ A place to store privleges for a channel.
 
 class ChannelPriv:
     '''Stores users privleges associated with a channel.'''
+    __slots__ = ("op", "voice")
+
     def __init__(self, isop = False, isvoice = False):
         self.op = isop
         self.voice = isvoice
\ No newline at end of file
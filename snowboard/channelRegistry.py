@@ -0,0 +1,57 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+The channels the bot is in, or means to be in, on a network, indexed by the
+channel name folded to lower case the same way as nicks, so finding one is a
+single lookup however many channels there are.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+class ChannelRegistry:
+    def __init__(self, fold = str.lower):
+        self.fold = fold         # Folds a name to lower case as the server does
+        self.__channels = {}     # Folded name to its Channel object
+
+    def __iter__(self):
+        return iter(list(self.__channels.values()))
+
+    def __len__(self):
+        return len(self.__channels)
+
+    def add(self, chan):
+        '''Add a Channel object, replacing any with the same name.'''
+        self.__channels[self.fold(chan.name)] = chan
+
+    def find(self, name):
+        '''Returns the Channel object for a name, or None if it is not known.'''
+        return self.__channels.get(self.fold(name))
+
+    def reindex(self):
+        '''Index every channel again, once the way names are folded has changed.'''
+        channels = list(self.__channels.values())
+        self.__channels.clear()
+
+        for chan in channels:
+            self.add(chan)
+            chan.reindex()
+
+    def remove(self, chan):
+        '''Remove a Channel object, if it is there.'''
+        key = self.fold(chan.name)
+
+        if self.__channels.get(key) is chan:
+            del self.__channels[key]
@@ -22,6 +22,7 @@ import configparser
 
 from . import channel
 from . import server
+from .floodControl import profiles
 
 # Global verbosity.
 verbosity = 0
@@ -46,15 +47,34 @@ class Config:
         self.delay = 1
         self.init = 0
         self.pingInterval = 300
-        self.checkInterval = 300
         self.maxLag = 90
         self.nickPass = None
         self.logLevel = 0
+        self.floodBurst, self.floodRate, self.floodBytes = profiles["rfc1459"]
+        self.raceWidth = 1
+        self.readBudget = 50
+        self.statusInterval = 10
 
         # Read configuration.
         self.file = configFile
 
-    def read(self):
+    def networkSections(self):
+        '''
+        Lists the network sections in the config file.  A file can describe
+        more than one network, using [Network] and/or [Network:anything]
+        sections, all sharing the other sections.
+        '''
+        config = configparser.ConfigParser()
+        config.read(self.file)
+
+        sections = []
+        for section in config.sections():
+            if section == "Network" or section.startswith("Network:"):
+                sections.append(section)
+
+        return sections
+
+    def read(self, networkSection = "Network"):
         '''Reads configuration data from the config file.'''
         # Get everything out of the configuration file.
         config = configparser.ConfigParser()
@@ -63,8 +83,8 @@ class Config:
         # Load all sections to parse
         # Network, server, and channel information is required
         # Parse Servers into a List, grab the network name.
-        self.network = config['Network']['name']
-        servers = config['Network']['servers']
+        self.network = config[networkSection]['name']
+        servers = config[networkSection]['servers']
         servers = servers.replace(' ','')
         combined = servers.split(',')
         for entry in combined:
@@ -79,7 +99,7 @@ class Config:
             self.servers.append(newServer)
 
         # Parse Channels into a List
-        channels = config['Network']['channels']
+        channels = config[networkSection]['channels']
         channels = channels.replace(' ','')
         self.channels = channels.split(',')
 
@@ -97,7 +117,7 @@ class Config:
             elif section == "Messages":
                 if "quit" in keys:
                     self.quitmsg = config[section]["quit"]
-            elif section == "Network":
+            elif section == networkSection:
                 if "sslverify" in keys:
                     verify = int(config[section]["sslverify"])
                     if verify == 0:
@@ -110,7 +130,27 @@ class Config:
                     self.delay = float(config[section]["delay"])
                 if "pingtimer" in keys:
                     self.pingInterval = int(config[section]["pingtimer"])
-                if "cleantimer" in keys:
-                    self.cleanInterval = int(config[section]["cleantimer"])
                 if "maxlag" in keys:
-                    self.maxLag = int(config[section]["maxlag"])
\ No newline at end of file
+                    self.maxLag = int(config[section]["maxlag"])
+                # A flood profile sets all three, the others then adjust it.
+                if "flood" in keys:
+                    profile = config[section]["flood"].lower()
+                    if not profile in profiles:
+                        raise ValueError("Unknown flood profile '" + profile + "', use one of " + ", ".join(sorted(profiles)) + ".")
+                    self.floodBurst, self.floodRate, self.floodBytes = profiles[profile]
+                if "floodburst" in keys:
+                    self.floodBurst = max(1, int(config[section]["floodburst"]))
+                if "floodrate" in keys:
+                    # Tokens must come back at some rate, anything else keeps
+                    # the rate of the profile.
+                    rate = float(config[section]["floodrate"])
+                    if rate > 0:
+                        self.floodRate = rate
+                if "floodbytes" in keys:
+                    self.floodBytes = int(config[section]["floodbytes"])
+                if "statustimer" in keys:
+                    self.statusInterval = int(config[section]["statustimer"])
+                if "race" in keys:
+                    self.raceWidth = max(1, int(config[section]["race"]))
+                if "readbudget" in keys:
+                    self.readBudget = max(1, int(config[section]["readbudget"]))
\ No newline at end of file
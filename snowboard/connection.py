@@ -28,6 +28,19 @@ import sys
 from . import debug
 from . import server
 
+def createContext(verify = True):
+    '''Creates the SSL context used to secure a connection.'''
+    context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+    context.options |= ssl.OP_NO_SSLv2
+    context.options |= ssl.OP_NO_SSLv3
+    if verify:
+        context.verify_mode = ssl.CERT_REQUIRED
+        context.load_default_certs()
+    else:
+        context.verify_mode = ssl.CERT_NONE
+
+    return context
+
 class Connection:
     def __init__(self, srv):
         self.host = srv.host
@@ -37,8 +50,30 @@ class Connection:
         self.__connected = False
         self.ssl = srv.ssl
         self.sslVerify = True
+        self.context = None        # SSL context, shared by the whole network
+        self.resumed = False       # If the TLS session was resumed
+        self.server = srv
         self.retries = 3           # Numbers of times to retry a connection
         self.delay = 1             # Delay between connection attempts
+        self.timeout = 30          # How long a single attempt may take
+        self.elapsed = 0           # How long the successful attempt took
+        self.bufferSize = 16384    # Largest single read from the socket
+        self.__inbound = bytearray()
+        self.__outbound = bytearray()
+        self.__recvBuffer = bytearray(self.bufferSize)
+
+    def attach(self, sock):
+        '''Use an already established socket for this connection.'''
+        sock.setblocking(False)
+        if self.ssl:
+            self.__ssl = sock
+            self.resumed = sock.session_reused
+            self.__saveSession()
+        else:
+            self.__socket = sock
+        self.__inbound = bytearray()
+        self.__outbound = bytearray()
+        self.__connected = True
 
     def connected(self):
         '''Returns the state of the connection.'''
@@ -53,26 +88,26 @@ class Connection:
         while (not self.__connected) and (attempt < self.retries):
             # Attempt to establish a connection.
             debug.message("Attempting connection to " + self.host + ":" + str(self.port) + ".")
+            start = time.time()
             try:
-                self.__socket = socket.setdefaulttimeout(30)
-                self.__socket = socket.create_connection((self.host, self.port))
+                self.__socket = socket.create_connection((self.host, self.port), self.timeout)
 
                 # Handle SSL
                 if self.ssl:
-                    self.__context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-                    self.__context.options |= ssl.OP_NO_SSLv2
-                    self.__context.options |= ssl.OP_NO_SSLv3
-                    if self.sslVerify:
-                        self.__context.verify_mode = ssl.CERT_REQUIRED
-                    else:
-                        self.__context.verify_mode = ssl.CERT_NONE
-                    self.__ssl = self.__context.wrap_socket(self.__socket)
+                    if self.context is None:
+                        self.context = createContext(self.sslVerify)
+                    self.__ssl = self.context.wrap_socket(self.__socket, session = self.server.session)
                     self.__ssl.setblocking(False)
+                    self.resumed = self.__ssl.session_reused
+                    self.__saveSession()
                 # Handle not SSL
                 else:
                     self.__socket.setblocking(False)
 
+                self.__inbound = bytearray()
+                self.__outbound = bytearray()
                 self.__connected = True
+                self.elapsed = time.time() - start
 
             # Assume connection errors are no big deal but do display an error.
             except ConnectionAbortedError:
@@ -84,113 +119,169 @@ class Connection:
             except socket.gaierror:
                 debug.error("Failed to resolve " + self.host + ".")
             except OSError as err:
-                debug.error("Failed to connect '" + err.errno + "' " + err.strerror + ".")
+                debug.error("Failed to connect '" + str(err.errno) + "' " + str(err.strerror) + ".")
 
             attempt += 1
 
-            time.sleep(self.delay)
+            if not self.__connected:
+                time.sleep(self.delay)
 
         return self.__connected
 
     def disconnect(self):
         '''Disconnect from the server.'''
         debug.message("Disconnected from " + self.host + ":" + str(self.port) + ".")
-        if ssl:
+        if self.ssl:
             if not self.__ssl is None:
+                self.__saveSession()
                 self.__ssl.close()
                 self.__ssl = None
         else:
             if not self.__socket is None:
                 self.__socket.close()
         self.__socket = None
+        self.__outbound = bytearray()
         self.__connected = False
 
-    def read(self):
-        '''Read a line of data from the server, if any.'''
-        # Only do something if we're connected.
-        if self.__connected:
-            done = False
-            received = ""
-
-            while not done:
-                try:
-                    if self.ssl:
-                        data = self.__ssl.recv(1)
-                    else:
-                        data = self.__socket.recv(1)
-                except (ssl.SSLWantReadError, BlockingIOError):
-                    received = None
-                    break
-                except OSError as err:
-                    debug.error("Error #" + str(err.errno) + ": '" + err.strerror + "' disconnecting.")
-                    data = False
-
-                # Process the data.
-                # socket.recv is supposed to return a False if the connection
-                # been broken.
-                if not data:
-                    self.disconnect()
-                    done = True
-                    received = None
-                else:
-                    text = data.decode('utf-8','replace')
-                    if text == '\n':
-                        done = True
-                    else:
-                        received += text
+    def flush(self):
+        '''
+        Hands as much of the output buffer to the socket as it will take
+        without blocking.  Returns True once the buffer is empty.
+        '''
+        while self.__connected and len(self.__outbound) > 0:
+            try:
+                sentNow = self.getSocket().send(self.__outbound)
+            except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return False
+            except OSError as err:
+                debug.error("Error #" + str(err.errno) + ": '" + str(err.strerror) + "' disconnecting.")
+                self.disconnect()
+                return False
+
+            # If nothing gets sent, we are disconnected from the server.
+            if sentNow == 0:
+                debug.error("Data could not be sent for an unknown reason, disconnecting.")
+                self.disconnect()
+                return False
+
+            del self.__outbound[:sentNow]
+
+        return len(self.__outbound) == 0
 
+    def getSocket(self):
+        '''Returns the socket in use, for watching with a selector.'''
+        if self.ssl:
+            return self.__ssl
         else:
-            received = None
+            return self.__socket
 
-        # Remove the trailing carriage return character (cr/lf pair)
-        if not received is None:
-            received = received.strip('\r')
-            if len(received) > 0:
-                if received[0] == ':':
-                    received = received[1:]
+    def outgoing(self):
+        '''Returns the number of bytes still waiting to be sent.'''
+        return len(self.__outbound)
 
-        # Bug fix for Issue #18, do not return blank lines.
-        if received == "":
-            received = None
+    def pending(self):
+        '''Returns the number of complete lines waiting to be read.'''
+        return self.__inbound.count(b'\n')
+
+    def read(self):
+        '''Read a line of data from the server, if any.'''
+        received = None
+
+        # Only do something if we're connected.  Lines are taken out of the
+        # receive buffer first, the socket is only read when there is no
+        # complete line left waiting.
+        while self.__connected:
+            received = self.__nextLine()
+            if received is None:
+                if not self.__fill():
+                    break
+            # Bug fix for Issue #18, do not return blank lines.
+            elif received == "":
+                received = None
+            else:
+                break
 
         return received
 
+    def waiting(self):
+        '''
+        Returns True if data can be read without waiting on the socket, either
+        a complete line in the receive buffer or decrypted SSL data.
+        '''
+        if self.__inbound.find(b'\n') >= 0:
+            return True
+        elif self.ssl and (not self.__ssl is None):
+            return self.__ssl.pending() > 0
+        else:
+            return False
+
     def write(self, data):
         '''Sends data to the server.'''
-        # Encode the data for the server.
-        data += '\n'
-        data = data.encode('utf-8')
-
-        # Prepare to keep track of what is being sent.
-        dataSent = 0
-        bufferSize = len(data)
-
-        if self.__connected:
-            # Loop to send the data.
-            while dataSent < bufferSize:
-                try:
-                    if self.ssl:
-                        sentNow = self.__ssl.send(data[dataSent:])
-                    else:
-                        sentNow = self.__socket.send(data[dataSent:])
-                except OSError as err:
-                    debug.error("Error #" + str(err.errno) + ": '" + err.strerror + "' disconnecting.")
-                    self.disconnect()
-                    return False
-
-                # If nothing gets sent, we are disconnected from the server.
-                if sentNow == 0:
-                    debug.error("Data could not be sent for an unknown reason, disconnecting.")
-                    self.disconnect()
-                    return False
-
-                # Keep track of the data.
-                dataSent += sentNow
-        else:
-            sent = False
+        return self.writeLines([data])
+
+    def writeLines(self, lines):
+        '''
+        Sends several lines to the server at once.  The lines are encoded into
+        the output buffer and handed to the socket in a single call, whatever
+        the socket will not take right away stays buffered for flush().
+        '''
+        if not self.__connected:
+            return False
+
+        for line in lines:
+            self.__outbound += line.encode('utf-8')
+            self.__outbound += b'\n'
+
+        self.flush()
+
+        return self.__connected
+
+    def __fill(self):
+        '''Pull as much waiting data as possible into the receive buffer.'''
+        if len(self.__recvBuffer) != self.bufferSize:
+            self.__recvBuffer = bytearray(self.bufferSize)
+
+        try:
+            if self.ssl:
+                size = self.__ssl.recv_into(self.__recvBuffer)
+            else:
+                size = self.__socket.recv_into(self.__recvBuffer)
+        except (ssl.SSLWantReadError, BlockingIOError):
+            return False
+        except OSError as err:
+            debug.error("Error #" + str(err.errno) + ": '" + str(err.strerror) + "' disconnecting.")
+            size = 0
+
+        # socket.recv_into returns zero bytes once the connection has been
+        # broken by the other side.
+        if size == 0:
+            self.disconnect()
+            return False
+
+        self.__inbound += memoryview(self.__recvBuffer)[:size]
+
+        return True
+
+    def __nextLine(self):
+        '''Take a single complete line out of the receive buffer, if any.'''
+        end = self.__inbound.find(b'\n')
+        if end < 0:
+            return None
+
+        line = self.__inbound[:end]
+        del self.__inbound[:end + 1]
 
-        # If sending completed, set the flag to true.
-        if dataSent == bufferSize:
-            sent = True
+        # Decode the whole line at once, then remove the trailing carriage
+        # return character (cr/lf pair), the rest is left for the parser.
+        return line.decode('utf-8', 'replace').rstrip('\r')
 
-        return sent
\ No newline at end of file
+    def __saveSession(self):
+        '''
+        Keep the TLS session on the server, so the next connection to it can
+        resume the session instead of doing a full handshake.  With TLS 1.3
+        the session ticket only arrives after the handshake, so this is done
+        again when disconnecting.
+        '''
+        session = self.__ssl.session
+        if not session is None:
+            self.server.session = session
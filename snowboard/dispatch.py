@@ -0,0 +1,80 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+The table of handlers for messages from the server, by command or numeric.
+Finding the handlers for a message is a single lookup, and a message nobody
+has asked for costs no more than that.
+
+Both the core and scripts register into the shared table, responses, when
+they are imported.  A handler is called as handler(net, message) with the
+parsed ServerMessage, and returns a list of commands to send or None.
+Handlers for the same command are called in the order they were added.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+class Dispatch:
+    def __init__(self):
+        self.handlers = {}  # Command or numeric, to a list of handlers
+
+    def handle(self, net, message):
+        '''Pass a message to its handlers, returns the commands they give.'''
+        handlers = self.handlers.get(message.command)
+        cmds = []
+
+        if handlers is None:
+            return cmds
+
+        for handler in handlers:
+            result = handler(net, message)
+            if not result is None:
+                cmds += result
+
+        return cmds
+
+    def handles(self, command):
+        '''Checks if anything is registered for a command.'''
+        return command.upper() in self.handlers
+
+    def register(self, commands, handler):
+        '''Add a handler for a command, or for each of a list of commands.'''
+        if isinstance(commands, str):
+            commands = [commands]
+
+        for command in commands:
+            command = command.upper()
+
+            if command in self.handlers:
+                self.handlers[command].append(handler)
+            else:
+                self.handlers[command] = [handler]
+
+    def unregister(self, commands, handler):
+        '''Remove a handler from a command, or from each of a list of commands.'''
+        if isinstance(commands, str):
+            commands = [commands]
+
+        for command in commands:
+            command = command.upper()
+            handlers = self.handlers.get(command, [])
+
+            if handler in handlers:
+                handlers.remove(handler)
+                if len(handlers) == 0:
+                    del self.handlers[command]
+
+# The table every part of the bot registers into.
+responses = Dispatch()
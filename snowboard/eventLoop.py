@@ -0,0 +1,104 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Waits for something to do on a network, the socket becoming readable, the
+send queue being able to go out, or the next timer coming due, instead of
+sleeping for a fixed amount of time.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import selectors
+import time
+
+class EventLoop:
+    def __init__(self):
+        self.networks = []
+        self.selector = selectors.DefaultSelector()
+        self.__sockets = {}  # The socket registered for each network
+
+    def watch(self, net):
+        '''Start watching a network.'''
+        if not net in self.networks:
+            self.networks.append(net)
+
+    def unwatch(self, net):
+        '''Stop watching a network.'''
+        if net in self.networks:
+            self.networks.remove(net)
+            self.__register(net, None, 0)
+
+    def wait(self, deadline):
+        '''
+        Wait until a watched network has something to do, or until the
+        deadline (in seconds since the epoch) passes.  Returns the networks
+        that woke the loop up.
+        '''
+        now = time.time()
+        timeout = max(0, deadline - now)
+        ready = []
+
+        for net in self.networks:
+            sock = net.getSocket()
+            events = 0
+
+            if not sock is None:
+                events = selectors.EVENT_READ
+
+                # Data that has already been read off the socket will not
+                # wake the selector, so do not wait at all.
+                if net.waiting():
+                    timeout = 0
+                    ready.append(net)
+
+                # Only ask about writing when there is something to send and
+                # flood control allows it, otherwise wake up when it will.
+                sendAt = net.sendDeadline()
+                if not sendAt is None:
+                    if sendAt <= now:
+                        events |= selectors.EVENT_WRITE
+                    else:
+                        timeout = min(timeout, sendAt - now)
+
+            self.__register(net, sock, events)
+
+        if len(self.__sockets) > 0:
+            for key, mask in self.selector.select(timeout):
+                if not key.data in ready:
+                    ready.append(key.data)
+        elif timeout > 0:
+            time.sleep(timeout)
+
+        return ready
+
+    def __register(self, net, sock, events):
+        '''Keep the selector in step with the socket a network is using.'''
+        existing = self.__sockets.get(net)
+
+        # After a reconnect the network has a new socket, forget the old one.
+        if (not existing is None) and ((not existing is sock) or events == 0):
+            self.selector.unregister(existing)
+            del self.__sockets[net]
+            existing = None
+
+        if events == 0:
+            return
+
+        if existing is None:
+            self.selector.register(sock, events, net)
+            self.__sockets[net] = sock
+        elif not self.selector.get_key(sock).events == events:
+            self.selector.modify(sock, events, net)
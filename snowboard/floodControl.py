@@ -0,0 +1,116 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Token bucket flood control for the lines sent to a server.  The bucket holds
+up to "burst" tokens and gains "rate" tokens a second, each line costs one
+token, plus one more for every "lineBytes" bytes in it when the server counts
+bytes as well as lines.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import time
+
+# Settings for the flood protection of common servers, as (burst, rate,
+# lineBytes).  rfc1459 is the message timer from section 8.10 of the RFC,
+# two seconds a line with up to ten seconds of credit, which most servers
+# are at least as generous as.  ircu adds a second for every 120 bytes.
+profiles = {
+    "rfc1459": (5, 0.5, 0),
+    "ircu": (5, 0.5, 240),
+    "hybrid": (10, 1, 0),
+    "ratbox": (10, 1, 0),
+    "charybdis": (10, 1, 0),
+    "solanum": (10, 1, 0),
+    "inspircd": (10, 1, 0),
+    "unreal": (8, 1, 0)
+}
+
+class FloodControl:
+    def __init__(self, burst = 5, rate = 0.5, lineBytes = 0):
+        self.burst = burst           # Most tokens that can be saved up
+        self.rate = rate             # Tokens gained every second
+        self.lineBytes = lineBytes   # Bytes one token pays for, 0 for lines only
+        self.tokens = burst
+        self.updated = time.time()
+        self.sent = 0                # Lines sent since the last reset
+        self.waitTotal = 0           # Time those lines spent queued
+        self.waitPeak = 0            # Longest any line spent queued
+
+    def cost(self, line):
+        '''Returns how many tokens sending a line will take.'''
+        if self.lineBytes > 0:
+            return 1 + len(line.encode('utf-8')) / self.lineBytes
+        else:
+            return 1
+
+    def nextTime(self, line, now):
+        '''Returns when there will be enough tokens to send a line.'''
+        self.__refill(now)
+        needed = self.__needed(line)
+
+        if self.tokens >= needed:
+            return now
+        else:
+            return now + (needed - self.tokens) / self.rate
+
+    def recordWait(self, wait):
+        '''Records how long a line spent queued before it was sent.'''
+        self.sent += 1
+        self.waitTotal += wait
+        if wait > self.waitPeak:
+            self.waitPeak = wait
+
+    def reset(self):
+        '''Start over with a full bucket, for a new connection.'''
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.sent = 0
+        self.waitTotal = 0
+        self.waitPeak = 0
+
+    def take(self, line, now):
+        '''
+        Take the tokens for a line if there are enough, returns True if the
+        line can be sent now.
+        '''
+        self.__refill(now)
+
+        if self.tokens >= self.__needed(line):
+            self.tokens -= self.cost(line)
+            return True
+        else:
+            return False
+
+    def waitAverage(self):
+        '''Returns the average time lines have spent queued.'''
+        if self.sent == 0:
+            return 0
+        else:
+            return self.waitTotal / self.sent
+
+    def __needed(self, line):
+        '''
+        Tokens there must be before a line can go.  A line costing more than
+        the whole bucket goes once the bucket is full, leaving it in debt.
+        '''
+        return min(self.cost(line), self.burst)
+
+    def __refill(self, now):
+        '''Add the tokens gained since the last update.'''
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
@@ -26,6 +26,7 @@ class LogFile:
         self.channel = channel
         self.file = None
         self.name = name.lower()
+        self.network = network
         self.path = "./logs/" + network + "/"
         self.pm = pm
 
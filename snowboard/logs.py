@@ -70,7 +70,8 @@ class Logs:
     def findServer(self, kind):
         return self.__findList(self.messages, kind)
 
-    def write(self, logData, name = "status", channel = False, private = False):
+    def write(self, logData, name = "status", channel = False, private = False, when = None):
+        '''Write a line to a log, stamped with when it happened, or now.'''
         if channel:
             log = self.addChannel(name)
         elif private:
@@ -78,7 +79,10 @@ class Logs:
         else:
             log = self.addServer(name)
 
-        t = time.time()
+        if when is None:
+            t = time.time()
+        else:
+            t = when
         s = time.localtime(t)
         ms = format(t - int(t), '1.3f')[1:]
         timePrefix = "[" + time.strftime("%y/%m/%d %H:%M:%S", s) + ms + "] "
@@ -88,98 +92,85 @@ class Logs:
         else:
             log.writeLog(timePrefix + logData)
 
-    def writeRecv(self, message):
+    def writeRecv(self, message, chanTypes = "#&"):
+        '''
+        Log a parsed message received from the server, chanTypes being the
+        characters a channel name can start with.
+        '''
         global messages
         global nonMessages
 
-        msgList = message.split()
-        msgListLen = len(msgList)
+        command = message.command
+        params = message.params
 
         name = "status"
         channel = False
         private = False
         logData = ""
 
-        if msgList[0].find("!") >= 0:
-            source = msgList[0].split("!")[0]
+        if message.nick is None:
+            source = ""
         else:
-            source = msgList[0]
-
-        if source[0] == ":":
-            source = source[1:]
+            source = message.nick
 
-        if msgListLen > 2:
-            if msgList[2][0] == "#":
+        if (not message.prefix is None) and len(params) > 0:
+            if len(params[0]) > 0 and params[0][0] in chanTypes:
                 channel = True
-                name = msgList[2]
+                name = params[0]
 
-            if msgList[1] in messages:
-                messageData = " ".join(msgList[3:])
-                if messageData[0] == ":":
-                    messageData = messageData[1:]
+            if command in messages:
+                messageData = message.text(1)
 
                 if not channel:
                     private = True
                     name = source
 
-                if msgList[1] == "PRIVMSG":
+                if command == "PRIVMSG":
                     logData = "<" + source + "> " + messageData
-                elif msgList[1] == "NOTICE":
-                    if msgList[0].find("!") < 0:
+                elif command == "NOTICE":
+                    if message.user is None:
                         name = "status"
                         private = False
                     logData = "[NOTICE from " + source + "] " + messageData
-                elif msgList[1] == "ACTION":
+                elif command == "ACTION":
                     logData = " * " + source + " " + messageData
-                elif (msgList[1] in ctcpGlobals.queries) or (msgList[1] in ctcpGlobals.replies):
-                    logData = "[CTCP " + msgList[1] + " from " + source + "] " + messageData
-            elif msgList[1] in nonMessages:
-                if msgList[2][0] == ":":
-                    msgList[2] = msgList[2][1:]
-                if msgList[1] == "NICK":
-                    logData = source + " changed their nick to " + msgList[2]
-                elif msgList[1] == "MODE":
-                    modeData = " ".join(msgList[3:])
-                    logData = source + " changed modes " + modeData
-                elif msgList[1] == "JOIN":
-                    logData = source + " has joined " + msgList[2]
-                elif msgList[1] == "PART":
-                    logData = source + " has left " + msgList[2]
-                    if msgListLen > 3:
-                        partMsg = " ".join(msgList[3:])
-                        if partMsg[0] == ":":
-                            partMsg = partMsg[1:]
-                        logData += " with message '" + partMsg + "'"
-                elif msgList[1] == "QUIT":
-                    quitMsg = " ".join(msgList[2:])
-                    logData = source + " has quit IRC  with message '" + quitMsg + "'"
+                elif (command in ctcpGlobals.queries) or (command in ctcpGlobals.replies):
+                    logData = "[CTCP " + command + " from " + source + "] " + messageData
+            elif command in nonMessages:
+                if command == "NICK":
+                    logData = source + " changed their nick to " + params[0]
+                elif command == "MODE":
+                    logData = source + " changed modes " + message.text(1)
+                elif command == "JOIN":
+                    logData = source + " has joined " + params[0]
+                elif command == "PART":
+                    logData = source + " has left " + params[0]
+                    if len(params) > 1:
+                        logData += " with message '" + message.text(1) + "'"
+                elif command == "QUIT":
+                    logData = source + " has quit IRC  with message '" + message.text(0) + "'"
             else:
-                if message[0] == ":":
-                    message = message[1:]
-
-                if msgList[1] == "375" or msgList[1] == "372" or msgList[1] == "376":
+                if command == "375" or command == "372" or command == "376":
                     name = "motd"
 
-                    motdStart = message.find(':')
-
-                    if motdStart >= 0:
-                        logData = message[motdStart + 1:]
+                    if not message.trailing is None:
+                        logData = message.trailing
                     else:
-                        logData = message
+                        logData = message.raw.lstrip(':')
                 else:
-                    logData = message
+                    logData = message.raw.lstrip(':')
 
-        elif msgListLen == 2:
-            logData = message
+        elif len(params) > 0 or (not message.prefix is None):
+            logData = message.raw.lstrip(':')
 
-        elif msgListLen == 1:
-            debug.warn("I got a strange message from the server, not sure what it means: " + message)
+        else:
+            debug.warn("I got a strange message from the server, not sure what it means: " + message.raw)
             return
 
         if len(logData) > 0:
-            self.write(logData, name, channel, private)
+            self.write(logData, name, channel, private, message.when())
 
-    def writeSent(self, message):
+    def writeSent(self, message, chanTypes = "#&"):
         global messages
         global nonMessages
 
@@ -192,7 +183,7 @@ class Logs:
         private = False
 
         if msgListLen > 2:
-            if msgList[1][0] == "#":
+            if msgList[1][0] in chanTypes:
                 channel = True
                 dest = msgList[1]
 
@@ -22,20 +22,22 @@ of strings, each item being a single command.
 See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
 '''
 
-# The amount of time the loop with sleep before going on to the next loop.
-idleTime = 1 / 8
-
 import argparse
+import asyncio
 import time
 from os.path import isfile
 
 from . import config
 from . import network
 from . import debug
+from . import dispatch
 from . import scripts
 from . import ircMessage
 from . import ctcpGlobals
+from .eventLoop import EventLoop
 from .logFile import LogFile
+from .supervisor import Supervisor
+from .workers import Workers
 
 def __parse_args(argv, cfg):
     """Parse command-line arguments."""
@@ -50,9 +52,10 @@ def __parse_args(argv, cfg):
                            default=0, action="count",
                            help="increase output verbosity")
 
-    # Default to snowboard.ini.
-    argparser.add_argument("--config", "-c",
-                           default="snowboard.ini", help = "specify the configuration file to use")
+    # Default to snowboard.ini.  More than one file can be given to run
+    # several networks from the one process.
+    argparser.add_argument("--config", "-c", nargs = "+",
+                           default=["snowboard.ini"], help = "specify the configuration file(s) to use")
 
     # The init command is used to define the system administrator, or, first
     # user when the bot is run for the first time, and should only be enabled
@@ -63,100 +66,122 @@ def __parse_args(argv, cfg):
     # Enabled / increase the level of logging done by the bot.
     argparser.add_argument("--log", "-l", default = 0, action = "count", help = "enable logging")
 
+    # Run on asyncio, so script handlers can await slow work without holding
+    # up the rest of the bot.
+    argparser.add_argument("--asyncio", "-a", default = False, action = "store_true",
+                           help = "run the bot on the asyncio runtime")
+
+    # Give every network a process of its own, looked after by this one.
+    argparser.add_argument("--workers", "-w", default = False, action = "store_true",
+                           help = "run each network in its own worker process")
+
     # Load all the options from the configuration.
     cfg.options = argparser.parse_args(argv)
     debug.verbosity = cfg.options.verbose
     debug.logLevel = cfg.options.log
     cfg.logLevel = cfg.options.log
     cfg.init = cfg.options.init
-    cfg.file = cfg.options.config
+    cfg.file = cfg.options.config[0]
 
-def __process_responses(net, raw):
+def __load_configs(cfg):
+    '''
+    Load a configuration for every network section of every configuration
+    file given on the command line.
+    '''
+    configs = []
+
+    for fileName in cfg.options.config:
+        if not isfile(fileName):
+            debug.error("Configuration file '" + fileName + "' could not be loaded!")
+            return None
+
+        fileConfig = config.Config(fileName)
+        for section in fileConfig.networkSections():
+            netConfig = config.Config(fileName)
+            netConfig.options = cfg.options
+            netConfig.logLevel = cfg.logLevel
+            netConfig.init = cfg.init
+            netConfig.read(section)
+            configs.append(netConfig)
+
+    return configs
+
+def __closing_link(net, message):
+    '''Process the server closing the link (per RFC 2812).'''
+    if message.param(0).lower().startswith("closing link"):
+        net.disconnect()
+
+def __bad_nick(net, message):
+    '''Process a bad nick response.'''
+    net.processBadNick()
+
+def __motd_done(net, message):
+    '''Only send commands after MOTD has been received.'''
+    net.motdDone = True
+
+def __pong(net, message):
+    '''Pong received, reset the number of pings missed.'''
+    net.missedPings = 0
+    net.pongReceived = time.time()
+    debug.info("Received a PONG response from the server.")
+    net.checkLag()
+
+def __process_responses(net, message):
     '''
     Process responses from the server and pass instructions to the network
     object.
     '''
-    response = raw.split()
-    cmds = []
+    cmds = dispatch.responses.handle(net, message)
+
+    cmds += __get_commands(message, net)
 
+    return cmds
+
+def __register_handlers(responses):
+    '''Register the core handlers for responses from the server.'''
     # Process a proper authentication.
-    if response[1] == "001":
-        net.processAuth(response)
-    # Process a bad nick response.
-    elif response[1] == "433":
-        net.processBadNick()
-    # Only send commands after MOTD has been received.
-    elif response[1] == "376":
-        net.motdDone = True
+    responses.register("001", network.Network.processAuth)
+    # Process IRCv3 capability negotiation.
+    responses.register("CAP", network.Network.processCap)
+    responses.register("433", __bad_nick)
+    responses.register("376", __motd_done)
+    # Process the features the server supports.
+    responses.register("005", network.Network.processISupport)
     # Process WHO responses to get hostnames.
-    elif response[1] == "352":
-        net.processWho(response)
+    responses.register("352", network.Network.processWho)
+    responses.register("354", network.Network.processWhox)
+    responses.register("315", network.Network.processWhoEnd)
     # Process NAMES responses to get all names for channels joined.
-    elif response[1] == "353":
-        net.processNames(response)
+    responses.register("353", network.Network.processNames)
     # Process a channel topic message when joining.
-    elif response[1] == "332" or response[1] == "TOPIC":
-        net.processTopic(response)
-    # Process the server closing the link (per RFC 2812)
-    elif " ".join(response[1:3]).strip(':').lower() == "closing link":
-        net.disconnect()
-    # Process a QUIT message.
-    elif response[1] == "QUIT":
-        net.processQuit(response)
-    # Process JOIN and PART messages.
-    elif response[1] == "JOIN" or response[1] == "PART":
-        net.processJoinPart(response)
-    # Process a NICK message.
-    elif response[1] == "NICK":
-        net.processNick(response)
-    # Process mode messages.
-    elif response[1] == "MODE":
-        net.processMode(response)
-    # Pong received, reset the number of pings missed.
-    elif response[1] == "PONG":
-        net.missedPings = 0
-        net.pongReceived = time.time()
-        debug.info("Received a PONG response from the server.")
-        net.checkLag()
-
-    cmds = __get_commands(raw, net)
-    if cmds is None:
-        cmds = []
-
-    return cmds
-
-def __get_commands(raw, net):
+    responses.register(["332", "TOPIC"], network.Network.processTopic)
+    responses.register("ERROR", __closing_link)
+    responses.register("QUIT", network.Network.processQuit)
+    responses.register(["JOIN", "PART"], network.Network.processJoinPart)
+    responses.register("NICK", network.Network.processNick)
+    responses.register("KICK", network.Network.processKick)
+    responses.register("MODE", network.Network.processMode)
+    # Process changes announced through IRCv3 capabilities.
+    responses.register("ACCOUNT", network.Network.processAccount)
+    responses.register("AWAY", network.Network.processAway)
+    responses.register("CHGHOST", network.Network.processChghost)
+    responses.register("PONG", __pong)
+
+def __get_commands(message, net):
     '''Gets commands from scripts to be then set back to the IRC Server'''
     commands = []
 
     # Prepare the server message for processing.
-    response = raw.split()
-    source = response[0]
-    cmd = response[1]
-
-    toChannel = False
-    if len(response) > 2:
-        dest = response[2]
-        if response[2][0] == "#":
-            toChannel = True
-    else:
-        dest = ""
-
-    # Process the source, if it is a user it will have nick and host.
-    temp = source.split('!')
-    srcNick = temp[0]
-
-    if len(temp) == 2:
-        srcHost = temp[1]
-    else:
-        srcHost = ""
+    cmd = message.command
+    dest = message.param(0)
+    toChannel = net.isChannel(dest)
 
-    # Separate out the message from the rest.
-    message = " ".join(response[3:])
-    message = message.strip(':')
+    # The source, if it is a user it will have nick and host.
+    srcNick = message.nick
+    srcHost = message.userHost()
 
     # Store all the data in an way that is easy to pass along.
-    ircMsg = ircMessage.ircMessage(net, srcNick, srcHost, dest, cmd, message)
+    ircMsg = ircMessage.ircMessage(net, srcNick, srcHost, dest, cmd, message.text(1))
 
     # Make sure that when we get a message from someone on IRC, we create
     # a Nick object in the master list for them and fill in what we can.
@@ -180,12 +205,9 @@ def __get_commands(raw, net):
         nick.getPrivs()
 
     # Reply to CTCP ping requests.
-    if cmd == "PING" and (not srcNick == net.server):
+    if cmd == "PING" and (not srcHost == ""):
         commands += net.ctcpPingReply(srcNick)
 
-    # Send the message to be processed by the scripts.
-    commands += scripts.rawMessages(net, raw)
-
     if ircMsg.command in ctcpGlobals.queries or ircMsg.command in ctcpGlobals.replies:
         commands += scripts.ctcpScripts(ircMsg)
 
@@ -210,31 +232,70 @@ def __get_commands(raw, net):
 
     return commands
 
-def main(argv):
-    # Get the configuration from the file specified by the command line options.
-    cfg = config.Config()
-    __parse_args(argv, cfg)
-
-    if not isfile(cfg.file):
-        debug.error("Configuration file '" + cfg.file + "' could not be loaded!")
-        return 1
+def __maintain(net, lastTimer, sentUser):
+    '''
+    Work done on every pass of the main loop, whichever runtime is driving
+    it.  Returns the updated time the timers were last run and whether the
+    USER command has been sent.
+    '''
+    # Workers report how they are doing to the parent process.
+    net.statusTimer(time.time())
+
+    if net.ready():
+        # Once the connection is ready, if we haven't joined any channels
+        # do so now.
+        if len(net.channels) == 0:
+            net.joinAll()
+        # Basis for the loop to execute timers, we only want to execute a
+        # timer if there at least one second between this loop and when
+        # timers were last run.
+        cmds = []
 
-    cfg.read()
-    debug.logStd = LogFile(cfg.network, "debug")
-    debug.logErr = LogFile(cfg.network, "error")
+        if not net.quitting:
+            currentTime = time.time()
+
+            # Cycle the log files to the new day.
+            tStruct = time.localtime(currentTime)
+            if (not net.logs.cycled) and (tStruct[3] == 0 and tStruct[4] == 0 and tStruct[5] == 0):
+                net.logs.cycle()
+                debug.logStd = LogFile(debug.logStd.network, "debug")
+                debug.logErr = LogFile(debug.logErr.network, "error")
+            elif net.logs.cycled and (tStruct[3] == 0 and tStruct[4] == 0) and (
+                    tStruct[5] == 1 or tStruct[5] == 2):
+                net.logs.cycled = False
+
+            # Begun processing timers, once every second on the
+            # clock, which is also when the event loop wakes up.
+            if int(lastTimer) < int(currentTime):
+                cmds += net.pingTimer(currentTime)
+                cmds += scripts.timers(net, currentTime)
+                lastTimer = currentTime
+                if len(cmds) > 0:
+                    net.sendCommands(cmds)
+    elif not sentUser:
+        net.sendCommands(["USER " + net.botnick.lower() + " 0 * :" + net.config.realname])
+        sentUser = True
 
-    if cfg.init > 0:
-        debug.warn("The 'init' command has been enabled.  See docs for more information.")
+    return lastTimer, sentUser
 
-    result = 0    # Define a result value, so we can pass it back to the shell
+def __process_line(net, message):
+    '''Process a single parsed line from the server, queueing any replies.'''
+    # If anything needs to be sent to the server, we'll get a list
+    # of commands from the response processor.
+    cmds = __process_responses(net, message)
+    if len(cmds) > 0:
+        net.sendCommands(cmds)
 
-    net = network.Network(cfg)
+def __run(net):
+    '''Drive a network from the selector based event loop.'''
+    loop = EventLoop()
+    loop.watch(net)
 
     while net.reconnect:
         # Establish a connection.
         if net.connect():
             debug.message("Attempting to authenticate.")
-            net.sendCommands(["NICK " + net.botnick])
+            net.sendCommands(["CAP LS 302", "NICK " + net.botnick])
             sentUser = False
         else:
             debug.error("Failed to connect.")
@@ -245,57 +306,126 @@ def main(argv):
         while net.online():
             # Send any commands.
             net.send()
-            # Is there data?
-            data = net.checkMessages()
-            if not data is None:
-                # If anything needs to be sent to the server, we'll get a list
-                # of commands from the response processor.
-                cmds = __process_responses(net, data)
-                if len(cmds) > 0:
-                    net.sendCommands(cmds)
+            # Process every line that is waiting, up to the read budget, so
+            # a large burst from the server does not fall behind.
+            received = 0
+            while received < net.config.readBudget:
+                data = net.checkMessages()
+                if data is None:
+                    break
 
-            if net.ready():
-                # Once the connection is ready, if we haven't joined any channels
-                # do so now.
-                if len(net.channels) == 0:
-                    net.joinAll()
-                # Basis for the loop to execute timers, we only want to execute a
-                # timer if there at least one second between this loop and when
-                # timers were last run.
-                cmds = []
-
-                if not net.quitting:
-                    currentTime = time.time()
-
-                    # Cycle the log files to the new day.
-                    tStruct = time.localtime(currentTime)
-                    if (not net.logs.cycled) and (tStruct[3] == 0 and tStruct[4] == 0 and tStruct[5] == 0):
-                        net.logs.cycle()
-                        debug.logStd = LogFile(cfg.network, "debug")
-                        debug.logErr = LogFile(cfg.network, "error")
-                    elif net.logs.cycled and (tStruct[3] == 0 and tStruct[4] == 0) and (
-                            tStruct[5] == 1 or tStruct[5] == 2):
-                        net.logs.cycled = False
-
-                    # Begun processing timers.
-                    if (lastTimer + 1) < currentTime:
-                        cmds += net.pingTimer(currentTime)
-                        cmds += net.cleanTimer(currentTime)
-                        cmds += scripts.timers(net, currentTime)
-                        lastTimer = currentTime
-                        if len(cmds) > 0:
-                            net.sendCommands(cmds)
-            elif not sentUser:
-                net.sendCommands(["USER " + net.botnick.lower() + " 0 * :" + net.config.realname])
-                sentUser = True
-
-            # Make sure we don't amp up the CPU to max.
-            global idleTime
-            time.sleep(idleTime)
+                received += 1
+                __process_line(net, data)
+
+            if received >= net.config.readBudget:
+                debug.info("Read budget used up, " + str(net.checkBacklog()) + " lines still waiting (peak of " + str(net.backlogPeak) + ").")
+            else:
+                net.checkBacklog()
+
+            lastTimer, sentUser = __maintain(net, lastTimer, sentUser)
+
+            # Wait for the server, the send queue, or the next second on the
+            # clock for the timers, whichever comes first.
+            if net.online():
+                loop.wait(int(time.time()) + 1)
 
         if (not (net.online() and net.ready())) and net.reconnect:
 
             debug.message("Disconnected from the server.  Attempting to reconnect in " + str(int(net.config.delay)) + " seconds...")
             time.sleep(net.config.delay)
 
+    return 0
+
+async def __run_async(net):
+    '''Drive a network from an asyncio event loop.'''
+    while net.reconnect:
+        # Establish a connection.
+        if await net.connectAsync():
+            debug.message("Attempting to authenticate.")
+            net.sendCommands(["CAP LS 302", "NICK " + net.botnick])
+            sentUser = False
+        else:
+            debug.error("Failed to connect.")
+            return 1
+
+        lastTimer = time.time()
+        reading = asyncio.ensure_future(net.checkMessagesAsync())
+
+        while net.online():
+            # Send any commands.
+            net.send()
+            await net.drain()
+
+            # Wait for the server, the send queue, or the next second on the
+            # clock for the timers, whichever comes first.
+            now = time.time()
+            timeout = int(now) + 1 - now
+            sendAt = net.sendDeadline()
+            if not sendAt is None:
+                timeout = max(0, min(timeout, sendAt - now))
+
+            done, pending = await asyncio.wait([reading], timeout = timeout)
+            if reading in done:
+                data = reading.result()
+                if not data is None:
+                    __process_line(net, data)
+                reading = asyncio.ensure_future(net.checkMessagesAsync())
+
+            lastTimer, sentUser = __maintain(net, lastTimer, sentUser)
+
+        reading.cancel()
+
+        if (not (net.online() and net.ready())) and net.reconnect:
+
+            debug.message("Disconnected from the server.  Attempting to reconnect in " + str(int(net.config.delay)) + " seconds...")
+            await asyncio.sleep(net.config.delay)
+
+    return 0
+
+def __run_asyncio(net):
+    '''Drive a single network on a new asyncio event loop.'''
+    return asyncio.run(__run_async(net))
+
+__register_handlers(dispatch.responses)
+scripts.registerHandlers(dispatch.responses)
+
+def main(argv):
+    # Get the configuration from the file specified by the command line options.
+    cfg = config.Config()
+    __parse_args(argv, cfg)
+
+    configs = __load_configs(cfg)
+    if configs is None:
+        return 1
+    elif len(configs) == 0:
+        debug.error("No [Network] sections were found in the configuration.")
+        return 1
+
+    # The debug and error logs are kept with the first network.
+    debug.logStd = LogFile(configs[0].network, "debug")
+    debug.logErr = LogFile(configs[0].network, "error")
+
+    if cfg.init > 0:
+        debug.warn("The 'init' command has been enabled.  See docs for more information.")
+
+    if cfg.options.asyncio:
+        runner = __run_asyncio
+    else:
+        runner = __run
+
+    # Each worker process sets up its own network.
+    if cfg.options.workers:
+        return Workers(configs, runner).run()
+
+    networks = []
+    for netConfig in configs:
+        networks.append(network.Network(netConfig))
+
+    # Pass a result value back to the shell.  Several networks always run
+    # together on asyncio, under a supervisor.
+    if len(networks) > 1:
+        result = asyncio.run(Supervisor(networks, __run_async).run())
+    else:
+        result = runner(networks[0])
+
     return result
@@ -20,47 +20,71 @@ network.
 See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
 '''
 
+import asyncio
 import time
 import random
 from os.path import isfile
 
 from . import debug
+from . import caseMapping
 from . import ctcpGlobals
-from .connection import Connection
+from .asyncConnection import AsyncConnection
+from .connection import Connection, createContext
 from .channel import Channel
+from .channelRegistry import ChannelRegistry
 from .nick import Nick
+from .nickRegistry import NickRegistry
+from .serverRace import ServerRace
 from .users import Users
 from .channelPriv import ChannelPriv
+from .floodControl import FloodControl
+from .sendQueue import SendQueue, BULK, laneFor, laneNames
+from .serverMessage import ServerMessage
 from .logs import Logs
 
+# Sent with WHOX queries, so the replies to them can be told apart.
+whoxToken = "1"
+
+# What channel names start with when the server does not say, from RFC 1459.
+defaultChanTypes = "#&"
+
+# IRCv3 capabilities the bot makes use of, requested if the server has them.
+wantedCaps = ("account-notify", "away-notify", "chghost", "extended-join",
+              "message-tags", "multi-prefix", "server-time", "userhost-in-names")
+
 class Network:
     def __init__(self, cfg):
         self.config = cfg
 
+        self.backlog = 0      # Lines received but not yet processed
+        self.backlogPeak = 0
         self.botnick = self.config.botnick[:] # Copied, not just a reference
-        self.channels = []
-        self.checkNext = 0
-        self.delay = 0.25
+        self.caps = set()     # IRCv3 capabilities enabled on the connection
+        self.nicks = NickRegistry() # First, channel names are folded the same way
+        self.channels = ChannelRegistry(self.nicks.fold)
+        self.flood = FloodControl(cfg.floodBurst, cfg.floodRate, cfg.floodBytes)
+        self.isupport = {}    # Features the server advertises in 005
         self.lastActivity = 0
+        self.loop = None      # The asyncio loop, when running on asyncio
         self.missedPings = 0
         self.motdDone = False
         self.name = self.config.network
-        self.nextSend = 0
-        self.nicks = []
-        self.orphans = []
         self.pingNext = 0
         self.pingSent = 0
         self.pongReceived = 0
-        self.queue = []
+        self.queue = SendQueue()
         self.quitting = False
         self.reconnect = True
-        self.sendBlock = 6
         self.server = None
+        self.sslContext = None # Shared by every connection to this network
+        self.statusNext = 0
+        self.statusPipe = None # Where to report status, when run as a worker
         self.users = Users(cfg.network)
         self.whoList = []
         self.__authenticated = False
+        self.__capsOffered = set()
         self.__connection = None
-        self.__lastServer = 0  # The index of the last server connected
+        self.__tasks = set()   # Asynchronous script handlers still running
 
         self.logs = Logs(self.name, self.botnick)
 
@@ -71,11 +95,11 @@ class Network:
         else:
             name = chan.name
 
-        existing = self.__checkChannels(name)
+        existing = self.channels.find(name)
 
         if existing is None:
-            newChannel = Channel(name, self.name)
-            self.channels.append(newChannel)
+            newChannel = Channel(name, self.name, self.nicks.fold)
+            self.channels.add(newChannel)
             self.sendCommands(newChannel.join())
             debug.info("Attempting to join '" + newChannel.name + "'.")
         else:
@@ -85,14 +109,21 @@ class Network:
 
     def addNick(self, nickName):
         '''Add a nick to the master list.'''
-        existing = self.findNick(nickName)
+        existing = self.nicks.find(nickName)
         if existing is None:
             newNick = Nick(nickName, self.users)
-            self.nicks.append(newNick)
+            self.nicks.add(newNick)
             return newNick
         else:
             return existing
 
+    def chanTypes(self):
+        '''
+        Returns the characters channel names start with on the server, from
+        CHANTYPES in 005, or # and & if it has not said.
+        '''
+        return self.isupport.get("CHANTYPES", defaultChanTypes)
+
     def checkLag(self):
         '''Checks to see how much server lag there is.'''
         lag = self.pongReceived - self.pingSent
@@ -102,71 +133,25 @@ class Network:
             debug.warn("Server lag is " + str(round(lag - self.config.maxLag, 3)) + " seconds longer than acceptable.  Disconnecting.")
             self.disconnect()
 
-    def checkMessages(self):
-        '''Check for new messages from the server.'''
-        data = self.__connection.read()
-        if not (data is None):
-            self.__pingpong(data)
-            if '\x01' in data:
-                data = self.__processCTCP(data)
-            self.lastActivity = time.time()
-
-            if self.config.logLevel > 0:
-                self.logs.writeRecv(data)
-
-        return data
-
-    def cleanNicks(self):
-        '''
-        Clean up the mast nick list, removing nicks that are no longer in
-        a channel where the bot resides.
-        '''
-        # If a nick remains with an open who request after it has been
-        # requested once (the last round) remove it from our list.
-        for nickObject in self.orphans:
-            if nickObject.openWHO:
-                debug.info("Removing " + nickObject.name + " from the master list.")
-                self.nicks.remove(nickObject)
-
-        # Start with a clean list of orphans (nicks who are without channel)
-        self.orphans = []
-
-        # A flag to see if a nick was found.
-        found = False
-
-        # Search each nick in turn.
-        for nickObject in self.nicks:
-            # Search for each nick in each channel.
-            for chanObject in self.channels:
-                chanNick = chanObject.findNick(nickObject)
-
-                # If we find it, set the flag, and break
-                if not chanNick is None:
-                    found = True
-                    break
-                else:
-                    found = False
+    def checkBacklog(self):
+        '''Updates the count of lines waiting to be processed.'''
+        if self.__connection is None:
+            self.backlog = 0
+        else:
+            self.backlog = self.__connection.pending()
 
-            # If the channels are all checked, and nothing found, remove it.
-            if not found:
-                debug.info("Found that " + nickObject.name + " was orphaned from any channels, checking online status.")
-                self.orphans.append(nickObject)
-                self.sendCommands(nickObject.sendWHO())
+        if self.backlog > self.backlogPeak:
+            self.backlogPeak = self.backlog
 
-    def cleanTimer(self, time):
-        '''Executes the Nick list cleaning every checkInterval seconds.'''
-        commands = []
+        return self.backlog
 
-        # When initialized, set next time it will run.
-        if self.checkNext == 0:
-            debug.message("Initialized master nick cleaning timer.")
-            self.checkNext = time + self.config.checkInterval
-        elif self.checkNext == time:
-            debug.info("Running cleaning routine for the master nicks list.")
-            self.cleanNicks()
-            self.checkNext = time + self.config.checkInterval
+    def checkMessages(self):
+        '''Check for new messages from the server, returns it parsed.'''
+        return self.receive(self.__connection.read())
 
-        return commands
+    async def checkMessagesAsync(self):
+        '''Wait for the next message from the server.'''
+        return self.receive(await self.__connection.read())
 
     def ctcpPingReply(self, src):
         '''Replies to CTCP Ping Requests'''
@@ -182,37 +167,71 @@ class Network:
             connected = self.__connection.connected()
             result = connected
 
-        serverIndex = 0
+        # Retry connecting until either the system is connected or none left
+        while not connected:
+            servers = self.__serverOrder()
+
+            if self.config.raceWidth > 1:
+                result = self.__race(servers)
+                if not result:
+                    time.sleep(self.config.delay)
+            else:
+                for server in servers:
+                    # Create the connection object, load settings from config
+                    self.__connection = self.__configure(Connection(server))
+
+                    # Try to connect, decide what to do next.
+                    result = self.__connection.connect()
+                    if result:
+                        self.__connected(server)
+                        break
+                    else:
+                        debug.message("Connection to " + server.host + ":" + str(server.port) + " failed.")
+                        server.recordFailure()
+
+                    time.sleep(self.config.delay)
+
+            # If we aren't connected yet, display a message about it.
+            if not result:
+                debug.message("Connection failed, trying again in " + str(self.config.delay) + " seconds...")
+
+            connected = result
+
+        return result
+
+    async def connectAsync(self):
+        '''Connect to the network from the asyncio runtime.'''
+        self.loop = asyncio.get_running_loop()
 
-        # Change the order of the servers so that the system reconnects to
-        # the next server on the list if it has to reconnect, assuming there
-        # is more than one server in the list.
-        if (len(self.config.servers) > 0) and (self.__lastServer > 0):
-            servers = self.config.servers[self.__lastServer:] + self.config.servers[:self.__lastServer]
+        if self.__connection is None:
+            connected = False
         else:
-            servers = self.config.servers[:]
+            connected = self.__connection.connected()
+            result = connected
 
         # Retry connecting until either the system is connected or none left
         while not connected:
-            for server in servers:
-                # Create the connection object, load settings from config
-                self.__connection = Connection(server)
-                self.__connection.logs = self.logs
-                self.__connection.retries = self.config.retries
-                self.__connection.delay = self.config.delay
-                self.__connection.sslVerify = self.config.sslVerify
-
-                # Try to connect, decide what to do next.
-                result = self.__connection.connect()
-                if result:
-                    debug.message("Connection to " + server.host + ":" + str(server.port) + " succeeded.")
-                    self.__lastServer = serverIndex
-                    break
-                else:
-                    serverIndex += 1
-                    debug.message("Connection to " + server.host + ":" + str(server.port) + " failed.")
+            servers = self.__serverOrder()
 
-                time.sleep(self.config.delay)
+            if self.config.raceWidth > 1:
+                result = await self.__raceAsync(servers)
+                if not result:
+                    await asyncio.sleep(self.config.delay)
+            else:
+                for server in servers:
+                    # Create the connection object, load settings from config
+                    self.__connection = self.__configure(AsyncConnection(server))
+
+                    # Try to connect, decide what to do next.
+                    result = await self.__connection.connect()
+                    if result:
+                        self.__connected(server)
+                        break
+                    else:
+                        debug.message("Connection to " + server.host + ":" + str(server.port) + " failed.")
+                        server.recordFailure()
+
+                    await asyncio.sleep(self.config.delay)
 
             # If we aren't connected yet, display a message about it.
             if not result:
@@ -222,6 +241,19 @@ class Network:
 
         return result
 
+    def defer(self, handler):
+        '''
+        Run an asynchronous script handler, queueing whatever commands it
+        returns once it is done.  On the asyncio runtime the bot carries on in
+        the meantime, otherwise the handler is run to completion right away.
+        '''
+        if self.loop is None:
+            self.__finishHandler(asyncio.run(self.__runHandler(handler)))
+        else:
+            task = self.loop.create_task(self.__runHandler(handler))
+            task.add_done_callback(self.__finishTask)
+            self.__tasks.add(task)
+
     def disconnect(self):
         '''Disconnect from the server.'''
         if self.__connection.connected:
@@ -238,15 +270,20 @@ class Network:
         self.logs.clearAll()
 
         # There are no nicks to keep track of when disconnected.
-        self.nicks = []
-        self.orphans = []
-        self.queue = []
+        self.nicks.clear()
+        self.nicks.setCaseMapping(caseMapping.default)
+        self.channels.reindex()
+        self.queue.clear()
+        self.isupport = {}
+        self.caps = set()
+        self.__capsOffered = set()
+        self.flood.reset()
 
         # There are no nicks in any channels while disconnected.
         for chan in self.channels:
             chan.botnick = None
             chan.joined = False
-            chan.members = []
+            chan.clearNicks()
             chan.opped = False
             chan.voiced = False
 
@@ -254,10 +291,25 @@ class Network:
         self.missedPings = 0
         self.lastActivity = 0
         self.pingNext = 0
-        self.checkNext = 0
 
         return self.__connection.connected
 
+    async def drain(self):
+        '''Wait for sent commands to be handed to the socket (asyncio only).'''
+        if self.online() and (not self.loop is None):
+            await self.__connection.drain()
+
+    def getSocket(self):
+        '''Returns the socket of the current connection, if any.'''
+        if self.online():
+            return self.__connection.getSocket()
+        else:
+            return None
+
+    def isChannel(self, name):
+        '''Checks if a message target is a channel, rather than a nick.'''
+        return len(name) > 0 and name[0] in self.chanTypes()
+
     def joinAll(self):
         '''Join all channels the bot is configured it.'''
         debug.message("Attempting to join all configured channels.")
@@ -266,25 +318,11 @@ class Network:
 
     def findChannel(self, channel):
         '''Find a channel in the networks channel list.'''
-        result = None
-
-        for existing in self.channels:
-            if channel.lower() == existing.name.lower():
-                result = existing
-                break
-
-        return result
+        return self.channels.find(channel)
 
     def findNick(self, nickName):
         '''Find a nick in the master list.'''
-        result = None
-
-        for existing in self.nicks:
-            if nickName.lower() == existing.name.lower():
-                result = existing
-                break
-
-        return result
+        return self.nicks.find(nickName)
 
     def online(self):
         '''Let the outside see if the bot is online.'''
@@ -325,13 +363,41 @@ class Network:
 
         return commands
 
-    def processAuth(self, response):
+    def prefixes(self):
+        '''
+        Returns the symbols that mark privileges in front of names, from the
+        PREFIX the server advertises, such as (ov)@+.
+        '''
+        prefix = self.isupport.get("PREFIX", "")
+
+        if ')' in prefix:
+            return prefix.partition(')')[2]
+        else:
+            return "@+"
+
+    def processAccount(self, message):
+        '''Process a user logging in to or out of services (account-notify).'''
+        nick = self.findNick(message.nick)
+
+        if not nick is None:
+            self.__updateAccount(nick, message.param(0, "*"))
+            debug.info("Processed an account change for " + message.nick + ".")
+
+    def processAuth(self, message):
         '''Process a successful authentication.'''
         debug.message("Authentication successful.")
-        self.server = response[0]
+        self.server = message.prefix
         self.__authenticated = True
         self.lastActivity = time.time()
 
+    def processAway(self, message):
+        '''Process a user going away or coming back (away-notify).'''
+        nick = self.findNick(message.nick)
+
+        if not nick is None:
+            nick.away = len(message.params) > 0
+            debug.info("Processed an away change for " + message.nick + ".")
+
     def processBadNick(self):
         '''Process a required change of nicks.'''
         debug.message("Primary nick was taken, choosing a replacement.")
@@ -340,29 +406,85 @@ class Network:
         self.botnick += addition
         self.sendCommands(["NICK " + self.botnick])
 
-    def processJoinPart(self, response):
+    def processCap(self, message):
+        '''
+        Process IRCv3 capability negotiation.  The capabilities the server
+        offers are collected, those the bot wants are requested, and once
+        the server has answered negotiation is ended so registration can
+        go on.
+        '''
+        subCommand = message.param(1).upper()
+        more = len(message.params) > 3 and message.params[2] == "*"
+        caps = message.params[-1].split()
+
+        if subCommand == "LS":
+            for cap in caps:
+                self.__capsOffered.add(cap.partition('=')[0])
+
+            # A long list comes over several lines, wait for the last.
+            if not more:
+                request = []
+                for cap in wantedCaps:
+                    if cap in self.__capsOffered:
+                        request.append(cap)
+
+                if len(request) > 0:
+                    self.sendCommands(["CAP REQ :" + " ".join(request)])
+                else:
+                    self.sendCommands(["CAP END"])
+        elif subCommand == "ACK":
+            for cap in caps:
+                if cap.startswith('-'):
+                    self.caps.discard(cap[1:])
+                else:
+                    self.caps.add(cap)
+
+            debug.message("Enabled capabilities: " + ", ".join(sorted(self.caps)) + ".")
+            self.sendCommands(["CAP END"])
+        elif subCommand == "NAK":
+            debug.message("The server refused the capabilities requested.")
+            self.sendCommands(["CAP END"])
+        elif subCommand == "DEL":
+            for cap in caps:
+                self.caps.discard(cap)
+
+    def processChghost(self, message):
+        '''Process a user changing their user name or host (chghost).'''
+        nick = self.findNick(message.nick)
+
+        if not nick is None and len(message.params) > 1:
+            self.__updateHost(nick, message.params[0] + "@" + message.params[1])
+            debug.info("Processed a host change for " + message.nick + " to " + nick.host + ".")
+
+    def processJoinPart(self, message):
         '''Process a join or part message from the server.'''
-        nck, host = self.__splitHostmask(response[0])
-        if response[2][0] == ':':
-            cJoined = response[2][1:]
-        else:
-            cJoined = response[2]
+        nck = message.nick
+        host = message.userHost()
+        cJoined = message.param(0)
 
         # If the message is from the bot itself, then it means we need to
         # mark a channel as joined.
-        if self.botnick.lower() == nck.lower():
+        if self.nicks.same(self.botnick, nck):
             # We can assume that if we're getting a join about the bot, that
             # channel is in the list, so it will be found.
-            chan = self.__checkChannels(cJoined)
-            if response[1] == "JOIN":
+            chan = self.channels.find(cJoined)
+            if message.command == "JOIN":
                 # Mark the channel as joined.
                 debug.message("Successfully joined " + chan.name + ".")
                 chan.joined = True
                 chan.botnick = self.botnick
-            elif response[1] == "PART":
+
+                # One WHO for the whole channel fills in everyone's host.
+                # With userhost-in-names the names already have them, it is
+                # then only needed for the accounts, if they are tracked.
+                if (not "userhost-in-names" in self.caps) or ("account-notify" in self.caps and "WHOX" in self.isupport):
+                    self.sendCommands(self.__whoChannel(chan))
+            elif message.command == "PART":
                 # Remove the channel if this is a part message.
                 debug.message("Successfully parted from " + chan.name + ".")
+                self.__leaveChannel(chan)
                 self.channels.remove(chan)
+                self.__dropQueued(chan.name)
         # If the message is not about the bot, process it for a nick
         else:
             # Find the channel, retrieve the object, could put error check
@@ -371,33 +493,57 @@ class Network:
             chanObject = self.findChannel(cJoined)
 
             # Process a join.
-            if response[1] == "JOIN":
+            if message.command == "JOIN":
                 nickObject = self.addNick(nck)
                 nickObject.host = host
                 nickObject.getPrivs()
+
+                # With extended-join the account comes along with the join.
+                if "extended-join" in self.caps and len(message.params) > 1:
+                    self.__updateAccount(nickObject, message.params[1])
                 cPriv = ChannelPriv(False, False)
-                chanObject.addNick(nickObject, cPriv)
+                self.__addMember(chanObject, nickObject, cPriv)
                 debug.message("Processed a join message on " + cJoined + " from " + nck + ".")
 
             # Process a part.
-            elif response[1] == "PART":
+            elif message.command == "PART":
                 nickObject = self.findNick(nck)
                 if not nickObject is None:
-                    chanObject.removeNick(nickObject)
+                    self.__removeMember(chanObject, nickObject)
                 debug.message("Processed a part message on " + cJoined + " from " + nck + ".")
 
-    def processMode(self, response):
+    def processKick(self, message):
+        '''Process someone, maybe the bot itself, being kicked from a channel.'''
+        chan = self.findChannel(message.param(0))
+        target = message.param(1)
+
+        if chan is None:
+            return
+
+        if self.nicks.same(self.botnick, target):
+            # The channel is kept, it is still one the bot is meant to be in.
+            debug.message("Kicked from " + chan.name + " by " + message.nick + ".")
+            self.__leaveChannel(chan)
+            chan.joined = False
+            chan.joinSent = False
+            self.__dropQueued(chan.name)
+        else:
+            nickObject = self.findNick(target)
+            if not nickObject is None:
+                self.__removeMember(chan, nickObject)
+            debug.message("Processed a kick on " + chan.name + " of " + target + ".")
+
+    def processMode(self, message):
         '''Process a mode change.'''
-        nickName, userHost = self.__splitHostmask(response[0])
-        dest = response[2]
-        modeChange = response[3]
+        dest = message.param(0)
+        modeChange = message.param(1)
 
         # This is pretty convoluted, but so are all the different ways you
         # can issue a mode change on IRC.
-        if dest[0] == '#' and len(response) > 4:
+        if self.isChannel(dest) and len(message.params) > 2:
             # Find the channel, prepare a list of targets from the message.
             chan = self.findChannel(dest)
-            targets = response[4:]
+            targets = message.params[2:]
             targetIndex = 0
 
             # Set some flags up, so we know if we're adding or subtracting
@@ -435,28 +581,25 @@ class Network:
                 # If a target has been found, look up the target and access
                 # that target channel / nick's privileges to modify.
                 if haveTarget:
-                    nck = self.findNick(target)
-                    chanNick = chan.findNick(nck)
-
                     # Change the privileges flags for the nick in the channel
                     # since mode changes can be all a single change (add or
                     # subtract, keep the same add/sub flags until changed by
                     # a different mode character.
                     if add and op:
-                        debug.info("Processed mode change on " + chan.name + " where " + nck.name + " was opped.")
-                        chanNick[1].op = True
+                        debug.info("Processed mode change on " + chan.name + " where " + target + " was opped.")
+                        chan.setOp(target, True)
                         op = False
                     elif add and voice:
-                        debug.info("Processed mode change on " + chan.name + " where " + nck.name + " was voiced.")
-                        chanNick[1].voice = True
+                        debug.info("Processed mode change on " + chan.name + " where " + target + " was voiced.")
+                        chan.setVoice(target, True)
                         voice = False
                     elif sub and op:
-                        debug.info("Processed mode change on " + chan.name + " where " + nck.name + " was deopped.")
-                        chanNick[1].op = False
+                        debug.info("Processed mode change on " + chan.name + " where " + target + " was deopped.")
+                        chan.setOp(target, False)
                         op = False
                     elif sub and voice:
-                        debug.info("Processed mode change on " + chan.name + " where " + nck.name + " was devoiced.")
-                        chanNick[1].voice = False
+                        debug.info("Processed mode change on " + chan.name + " where " + target + " was devoiced.")
+                        chan.setVoice(target, False)
                         voice = False
 
                     # The target is no longer valid.
@@ -466,15 +609,23 @@ class Network:
             # it stands in the channel.
             chan.updateSelf()
 
-    def processNames(self, response):
+    def processNames(self, message):
         '''
         Process a server response to a NAMES command, parse out the names
         for a given channel.
         '''
         # Whittle down to just a list of names, with privs still attached
-        channelName = response[4]
-        names = response[5:]
-        names[0] = names[0][1:]
+        channelName = message.param(2)
+        names = message.param(3).split()
+
+        # The symbols that can come before a name, there may be several
+        # of them with multi-prefix.
+        prefixes = self.prefixes()
+
+        existing = self.findChannel(channelName)
+        if existing is None:
+            debug.message("Received names for unknown channel, " + channelName + ".")
+            return
 
         # Go through each name, progressively building its privs and adding
         # each name to the channel list and the master list.
@@ -483,77 +634,81 @@ class Network:
             opped = False
             voiced = False
 
-            if name[0] == '@':
-                opped = True
-                name = name[1:]
-            elif name[0] == '+':
-                voiced = True
+            while len(name) > 0 and name[0] in prefixes:
+                if name[0] == '@':
+                    opped = True
+                elif name[0] == '+':
+                    voiced = True
                 name = name[1:]
 
-            # First, add the nick to the master list.
-            nick = self.addNick(name)
+            # With userhost-in-names each name comes as nick!user@host.
+            name, host = self.__splitHostmask(name)
 
-            if nick.host is None or nick.host == "":
-                self.sendCommands(nick.sendWHO())
+            # First, add the nick to the master list.  Hosts are filled in
+            # from the names themselves or by the WHO for the whole channel
+            # sent after joining.
+            nick = self.addNick(name)
+            if not host == "":
+                self.__updateHost(nick, host)
 
             # Second, add the nick to the channel's nick list with privileges
             cPriv = ChannelPriv(opped, voiced)
-            existing = self.findChannel(channelName)
-            existing.addNick(nick, cPriv)
+            self.__addMember(existing, nick, cPriv)
 
         existing.updateSelf()
 
         debug.info("Processed a list of names on " + channelName + ".")
 
-    def processNick(self, response):
+    def processNick(self, message):
         '''Process a nick change.'''
         # Since the bot processes NAMES and JOINS messages, there should
         # never be a time when a NICK message comes in that it is not already
         # in the list.
 
         # If the bot's nick is the one that has changed, keep track.
-        nickName, userHost = self.__splitHostmask(response[0])
-        if response[2][0] == ':':
-            response[2] = response[2][1:]
-        if nickName.lower() == self.botnick.lower():
-            self.botnick = response[2]
+        nickName = message.nick
+        newNick = message.param(0)
+        if self.nicks.same(nickName, self.botnick):
+            self.botnick = newNick
             for chan in self.channels:
                 chan.botnick = self.botnick
-        elif nickName.lower() == self.config.botnick.lower():
+        elif self.nicks.same(nickName, self.config.botnick):
             self.sendCommands(["NICK " + self.config.botnick])
             debug.message("My default nick is no longer in use, changing nicks.")
 
-        nickObject = self.findNick(nickName)
-        nickObject.name = response[2]
+        nickObject = self.nicks.find(nickName)
+        if not nickObject is None:
+            self.nicks.rename(nickObject, newNick)
+            for chan in self.channels:
+                chan.renameNick(nickName, nickObject)
 
-        debug.info("Processed a nick change from " + nickName + " to " + response[2] + ".")
+        debug.info("Processed a nick change from " + nickName + " to " + newNick + ".")
 
-    def processTopic(self, response):
+    def processTopic(self, message):
         '''Process channel topics.'''
-        if response[1] == "332":
-            chan = self.findChannel(response[3])
-            data = response[4:]
+        if message.command == "332":
+            channelName = message.param(1)
+            topic = message.text(2)
         else:
-            chan = self.findChannel(response[2])
-            data = response[3:]
+            channelName = message.param(0)
+            topic = message.text(1)
+
+        chan = self.findChannel(channelName)
 
         if not chan is None:
-            if data[0][0] == ":":
-                chan.topic = " ".join(data[0:])[1:]
-            else:
-                chan.topic = " ".join(data[0:])
+            chan.topic = topic
 
             debug.message("Processed channel topic for " + chan.name + ".")
         else:
-            debug.message("Received a topic for unknown channel, " + response[2] + ".")
+            debug.message("Received a topic for unknown channel, " + channelName + ".")
 
-    def processQuit(self, response):
+    def processQuit(self, message):
         '''
         Processes a quit message from the server to remove said user from
         the master nick list and all other lists.
         '''
-        # Unpack the nick from the host, the host part isn't required
-        nickName, host = self.__splitHostmask(response[0])
+        # Only the nick is needed, not the host.
+        nickName = message.nick
 
         # Find the nick in the master list.
         nickObject = self.findNick(nickName)
@@ -562,26 +717,76 @@ class Network:
         if not nickObject is None:
             # Had to alter this so that the bot didn't think it was supposed
             # to change nicks when it was quitting IRC, mostly cosmetic.
-            if nickObject.name == self.config.botnick and (not self.botnick.lower() == self.config.botnick.lower()):
+            if nickObject.name == self.config.botnick and (not self.nicks.same(self.botnick, self.config.botnick)):
                 self.sendCommands(["NICK " + self.config.botnick])
                 debug.message("My default nick is no longer in use, changing nicks.")
 
             # Remove the nick from all channel lists first.
             for chan in self.channels:
-                chan.removeNick(nickObject)
+                self.__removeMember(chan, nickObject)
 
             # Remove the nick from the master list last.
             self.nicks.remove(nickObject)
 
+        # Anything still waiting to be sent to them can go.
+        self.__dropQueued(nickName)
+
         debug.message("Processed a quit message from " + nickName + ".")
 
-    def processWho(self, response):
-        '''Process the server response from the WHO command.'''
-        nick = self.findNick(response[7])
-        nick.host = response[4] + "@" + response[5]
-        nick.openWHO = False
-        nick.user.uid = self.users.matchHost(nick.host)
-        debug.info("Processed a WHO response for " + nick.name + "!" + nick.host + ".")
+    def processISupport(self, message):
+        '''
+        Process the features the server advertises (005), each as a
+        KEY=VALUE or KEY token, a -KEY token withdraws a feature.  The
+        first parameter is the bot's nick, the last is a description.
+        '''
+        for token in message.params[1:-1]:
+            if token.startswith('-'):
+                self.isupport.pop(token[1:].upper(), None)
+            else:
+                key, equals, value = token.partition('=')
+                self.isupport[key.upper()] = value
+
+        # Nicks are compared the way the server says to compare them.
+        mapping = self.isupport.get("CASEMAPPING", caseMapping.default)
+        if not mapping.lower() == self.nicks.caseMapping:
+            self.nicks.setCaseMapping(mapping)
+            self.channels.reindex()
+
+        debug.info("Processed the features supported by the server.")
+
+    def processWho(self, message):
+        '''
+        Process the server response from the WHO command, sent back as
+        channel, user, host, server, nick, flags and hops with real name.
+        '''
+        self.__whoReply(message.param(5), message.param(2), message.param(3))
+
+    def processWhoEnd(self, message):
+        '''
+        Process the end of a WHO reply.  Anyone in a channel the reply did
+        not cover is looked up on their own.
+        '''
+        chan = self.findChannel(message.param(1))
+
+        if not chan is None:
+            missing = 0
+            for member in chan.memberList():
+                nick = member.nick
+                if (nick.host is None or nick.host == "") and (not nick.openWHO):
+                    self.sendCommands(nick.sendWHO())
+                    missing += 1
+
+            debug.info("Processed a WHO response for " + chan.name + ", " + str(missing) + " hosts still unknown.")
+
+    def processWhox(self, message):
+        '''
+        Process a WHOX response, sent back as token, channel, user, host,
+        nick, flags, account for the %tcuhnfa fields asked for.
+        '''
+        if len(message.params) < 8 or not message.params[1] == whoxToken:
+            return
+
+        self.__whoReply(message.params[5], message.params[3], message.params[4], message.params[7])
 
     def quit(self):
         '''Properly quit from the server.'''
@@ -593,6 +798,28 @@ class Network:
         '''Let the outside world see if the connection is ready.'''
         return self.__authenticated and self.motdDone
 
+    def receive(self, data):
+        '''
+        Handle the housekeeping for a line received from the server.  The
+        line is parsed here, once, and the parsed message is returned for
+        the rest of the bot to work from.
+        '''
+        message = None
+
+        if not (data is None):
+            message = ServerMessage.parse(data)
+
+        if not (message is None):
+            self.__pingpong(message)
+            if (not message.trailing is None) and ctcpGlobals.char in message.trailing:
+                message = self.__processCTCP(message)
+            self.lastActivity = time.time()
+
+            if self.config.logLevel > 0:
+                self.logs.writeRecv(message, self.chanTypes())
+
+        return message
+
     def removeAccess(self, uid):
         '''Removes access for a uid across all nicks.'''
         for nick in self.nicks:
@@ -602,7 +829,7 @@ class Network:
 
     def removeChannel(self, chan):
         '''Remove a channel from the network.'''
-        existing = self.__checkChannels(chan.name)
+        existing = self.channels.find(chan.name)
         if not existing is None:
             if existing.joined:
                 self.sendCommands(existing.part())
@@ -614,42 +841,46 @@ class Network:
                 nick.getPrivs()
 
     def send(self):
-        '''Actually send a certain number of commands from the queue.'''
-        if len(self.queue):
-            if time.time() > self.nextSend:
-                # Send a couple of lines, then wait.
-                for cmd in self.queue[:self.sendBlock]:
-                    self.__connection.write(cmd)
-                    if self.config.logLevel > 1:
-                        self.logs.writeSent(cmd)
-                self.queue = self.queue[self.sendBlock:]
-
-                # Set up the next time the Queue will be processed.
-                self.delay += 0.25
-                self.sendBlock -= 1
-                self.nextSend = time.time() + self.delay
-
-                # Once those lines are sent, delay longer before the next.
-                if self.delay > 1.5:
-                    self.delay = 1.5
-
-                if self.sendBlock < 1:
-                    self.sendBlock = 1
-        # When there is nothing to send, reset the block size and delay.
+        '''Send as many commands from the queue as flood control allows.'''
+        # Whatever the socket would not take last time goes out first, no new
+        # lines are released until it has.
+        if self.online() and (not self.__connection.flush()):
+            return
+
+        now = time.time()
+        block = []
+
+        while len(self.queue) > 0 and self.flood.take(self.queue.peek()[0], now):
+            cmd, queuedAt = self.queue.pop()
+            self.flood.recordWait(now - queuedAt)
+            block.append(cmd)
+
+            if self.config.logLevel > 1:
+                self.logs.writeSent(cmd, self.chanTypes())
+            debug.trace("Sent after " + str(round(now - queuedAt, 3)) + " seconds queued: " + cmd)
+
+        # The lines released together go out in one write.
+        if len(block) > 0:
+            self.__connection.writeLines(block)
+
+    def sendDeadline(self):
+        '''Returns when the queue can next be sent, or None if it is empty.'''
+        # Output the socket would not take yet can go as soon as it is able.
+        if self.online() and self.__connection.outgoing() > 0:
+            return time.time()
+        elif len(self.queue):
+            return self.flood.nextTime(self.queue.peek()[0], time.time())
         else:
-            if time.time() > self.nextSend:
-                if self.delay > 0.25:
-                    self.delay -= 0.25
-                if self.sendBlock < 6:
-                    self.sendBlock += 1
-                self.nextSend = time.time() + self.delay
+            return None
 
-    def sendCommands(self, list):
-        '''Sends a list of commands to the server.'''
-        encodedCommands = []
+    def sendCommands(self, list, lane = None):
+        '''
+        Sends a list of commands to the server.  Unless a lane is given, each
+        command is put in the lane its type belongs in.
+        '''
+        now = time.time()
 
         for command in list:
-            noAppend = False  # Some commands we don't want to actually queue
             cmdList = command.split()
 
             if len(cmdList) > 0:
@@ -660,20 +891,20 @@ class Network:
                     cmdList[0] = ctcpGlobals.queries[ctcpGlobals.replies.index(cmdList[0]) + 1]
                     command = "NOTICE " + cmdList[1] + " :" + ctcpGlobals.char + cmdList[0].upper() + " " + " ".join(
                         cmdList[2:]).strip(':') + ctcpGlobals.char
-                elif cmdList[0].upper() == "WHO":
-                    if command in self.queue:
-                        noAppend = True
 
-            if not noAppend:
-                command = command.replace("::B::", "\x02")
-                command = command.replace("::I::", "\x1D")
-                command = command.replace("::U::", "\x1F")
-                command = command.replace("::R::", "\x16")
-                command = command.replace("::P::", "\x0F")
-                encodedCommands.append(command)
-
-        # After encoding any CTCP messages, add them to the queue.
-        self.queue += encodedCommands
+            command = command.replace("::B::", "\x02")
+            command = command.replace("::I::", "\x1D")
+            command = command.replace("::U::", "\x1F")
+            command = command.replace("::R::", "\x16")
+            command = command.replace("::P::", "\x0F")
+
+            # After encoding any CTCP messages, add them to the queue, along
+            # with when they were queued.  The queue leaves out repeats of
+            # commands such as WHO that are already waiting.
+            if lane is None:
+                self.queue.push(command, laneFor(command), now)
+            else:
+                self.queue.push(command, lane, now)
 
     def sendFile(self, fileName, method, dest):
         '''Sends a file to a destination using a particular method.'''
@@ -698,7 +929,7 @@ class Network:
             file.close()
 
             if len(commands) > 0:
-                self.sendCommands(commands)
+                self.sendCommands(commands, BULK)
         else:
             debug.error("Could not send file " + fileName + ", the file was not found.")
             self.sendCommands([msgPrefix + "That information could not be located.  Please contact the bot admin."])
@@ -736,46 +967,219 @@ class Network:
 
         return lineList
 
-    def __checkChannels(self, channel):
-        '''See if a channel already exists.'''
-        result = None
-
-        # Find if a channel exists already in the list.
-        for chan in self.channels:
-            if chan.name.lower() == channel.lower():
-                result = chan
-                break
+    def status(self):
+        '''Returns a summary of the state of the network, for monitoring.'''
+        return {
+            "name": self.name,
+            "server": self.server,
+            "online": self.online(),
+            "ready": self.ready(),
+            "channels": len(self.channels),
+            "nicks": len(self.nicks),
+            "recentNicks": self.nicks.recent(),
+            "queue": len(self.queue),
+            "lanes": self.queue.depths(),
+            "lanePeaks": dict(zip(laneNames, self.queue.peaks)),
+            "sendWait": self.flood.waitAverage(),
+            "sendWaitPeak": self.flood.waitPeak,
+            "backlog": self.backlog,
+            "backlogPeak": self.backlogPeak
+        }
+
+    def statusTimer(self, time):
+        '''Reports the status to the parent process every statusInterval seconds.'''
+        if (not self.statusPipe is None) and time >= self.statusNext:
+            try:
+                self.statusPipe.send(self.status())
+            except OSError:
+                debug.warn("Could not report status to the parent process.")
+                self.statusPipe = None
+
+            self.statusNext = time + self.config.statusInterval
+
+    def waiting(self):
+        '''Checks if received data is ready to process without waiting.'''
+        if self.online():
+            return self.__connection.waiting()
+        else:
+            return False
 
-        return result
+    def __addMember(self, chan, nick, priv):
+        '''Add a nick to a channel, counting the channel for the nick.'''
+        if chan.addNick(nick, priv):
+            self.nicks.joined(nick)
+
+    def __configure(self, conn):
+        '''Load the settings for a new connection from the config.'''
+        conn.logs = self.logs
+        conn.retries = self.config.retries
+        conn.delay = self.config.delay
+        conn.sslVerify = self.config.sslVerify
+        conn.context = self.__sslContext()
+
+        return conn
+
+    def __connected(self, server):
+        '''Note a successful connection and how long it took.'''
+        elapsed = self.__connection.elapsed
+        resumed = self.__connection.resumed
+        server.recordConnect(elapsed, resumed)
+
+        if resumed:
+            how = " (TLS session resumed)."
+        else:
+            how = "."
+
+        debug.message("Connection to " + server.host + ":" + str(server.port) + " succeeded in " +
+                      str(round(elapsed, 3)) + " seconds" + how)
+
+    def __dropQueued(self, target):
+        '''Throw away queued lines for a channel or nick that has gone.'''
+        dropped = self.queue.drop(target)
+        if dropped > 0:
+            debug.info("Dropped " + str(dropped) + " queued lines for " + target + ".")
+
+    def __finishHandler(self, commands):
+        '''Queue the commands returned by an asynchronous script handler.'''
+        if (not commands is None) and len(commands) > 0 and self.online():
+            self.sendCommands(commands)
+
+    def __finishTask(self, task):
+        '''Called by asyncio when an asynchronous script handler is done.'''
+        self.__tasks.discard(task)
+        if not task.cancelled():
+            self.__finishHandler(task.result())
+
+    def __leaveChannel(self, chan):
+        '''The bot has left a channel, no one in it shares that channel now.'''
+        for member in chan.memberList():
+            self.nicks.left(member.nick)
+        chan.clearNicks()
 
     def __pingpong(self, message):
         '''Respond to a ping request.'''
-        line = message.split()
-        if line[0] == "PING":
-            message = "PONG " + line[1]
-            self.sendCommands([message])
-
-    def __processCTCP(self, data):
-        '''Correctly handle CTCP message and responses.'''
-        data = data.replace(ctcpGlobals.char, '')
-        dataList = data.split()
+        if message.command == "PING":
+            self.sendCommands(["PONG :" + message.param(0)])
 
-        if dataList[1] == "PRIVMSG":
+    def __processCTCP(self, message):
+        '''
+        Correctly handle CTCP message and responses, the CTCP command takes
+        the place of PRIVMSG or NOTICE in the message handed on.
+        '''
+        if message.command == "PRIVMSG":
             ctcpReply = False
-        elif dataList[1] == "NOTICE":
+        elif message.command == "NOTICE":
             ctcpReply = True
+        else:
+            return message
+
+        dataList = message.trailing.replace(ctcpGlobals.char, '').split()
+        if len(dataList) == 0:
+            return message
 
-        ctcpCmd = dataList[3].strip(':')
+        ctcpCmd = dataList[0]
 
         if ctcpReply and ctcpCmd in ctcpGlobals.queries:
             ctcpCmd = ctcpGlobals.replies[ctcpGlobals.queries.index(ctcpCmd) - 1]
 
-        if len(dataList) > 4:
-            data = dataList[0] + " " + ctcpCmd + " " + dataList[2] + " :" + " ".join(dataList[4:])
-        else:
-            data = dataList[0] + " " + ctcpCmd + " " + dataList[2]
+        params = [message.param(0)]
+        if len(dataList) > 1:
+            params.append(" ".join(dataList[1:]))
+
+        return message.withCommand(ctcpCmd, params)
+
+    async def __runHandler(self, handler):
+        '''Await a script handler, making sure an error does not escape.'''
+        try:
+            return await handler
+        except Exception as err:
+            debug.error("A script handler failed: " + repr(err))
+            return []
+
+    def __race(self, servers):
+        '''Race connections to several servers, keeping the first to finish.'''
+        race = ServerRace(servers, self.config.sslVerify)
+        race.context = self.__sslContext()
+        race.width = self.config.raceWidth
+
+        won = race.run()
+        if won is None:
+            return False
+
+        server, sock, elapsed = won
+        self.__connection = self.__configure(Connection(server))
+        self.__connection.attach(sock)
+        self.__connection.elapsed = elapsed
+        self.__connected(server)
+
+        return True
+
+    async def __raceAsync(self, servers):
+        '''
+        Race connections to several servers from the asyncio runtime, keeping
+        the first to finish.  The addresses of each server are raced as well.
+        '''
+        waiting = list(servers)
+        running = {}
+        winner = None
+
+        while (winner is None) and (len(waiting) > 0 or len(running) > 0):
+            # Keep as many attempts going as allowed.
+            while len(waiting) > 0 and len(running) < self.config.raceWidth:
+                server = waiting.pop(0)
+                conn = self.__configure(AsyncConnection(server))
+                conn.retries = 1
+                conn.raceDelay = 0.25
+                running[asyncio.ensure_future(conn.connect())] = (server, conn)
+
+            done, pending = await asyncio.wait(running, return_when = asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                server, conn = running.pop(task)
+                if task.result():
+                    # Two attempts can finish together, only one may win.
+                    if winner is None:
+                        winner = (server, conn)
+                    else:
+                        conn.disconnect()
+                else:
+                    server.recordFailure()
+
+        # Cancel everything still going.
+        for task in running:
+            task.cancel()
 
-        return data
+        if winner is None:
+            return False
+
+        server, self.__connection = winner
+        self.__connected(server)
+
+        return True
+
+    def __removeMember(self, chan, nick):
+        '''Remove a nick from a channel, no longer counting it for the nick.'''
+        if chan.removeNick(nick):
+            self.nicks.left(nick)
+
+    def __serverOrder(self):
+        '''
+        Order the servers so the fastest healthy server is tried first, then
+        servers never tried, then servers that have been failing.  Servers
+        that rank the same keep the order they were configured in.
+        '''
+        return sorted(self.config.servers, key = lambda server: server.rank())
+
+    def __sslContext(self):
+        '''
+        Returns the SSL context for this network, made the first time it is
+        needed.  Using one context for every connection lets the TLS sessions
+        saved on each server be resumed when reconnecting.
+        '''
+        if self.sslContext is None:
+            self.sslContext = createContext(self.config.sslVerify)
+
+        return self.sslContext
 
     def __splitHostmask(self, hostmask):
         '''Split the hostname into host and nick.'''
@@ -783,4 +1187,38 @@ class Network:
         hostmask = hostmask.split('!')
         if len(hostmask) < 2:
             hostmask.append("")
-        return (hostmask[0], hostmask[1])
\ No newline at end of file
+        return (hostmask[0], hostmask[1])
+
+    def __updateAccount(self, nick, account):
+        '''Record the services account of a nick, * or 0 meaning none.'''
+        if account == "*" or account == "0":
+            nick.account = None
+        else:
+            nick.account = account
+
+    def __updateHost(self, nick, host):
+        '''Record the user@host of a nick and the user it belongs to.'''
+        nick.host = host
+        nick.openWHO = False
+        nick.setUID(self.users.matchHost(nick.host))
+
+    def __whoChannel(self, chan):
+        '''
+        Builds the WHO for a whole channel, using WHOX to ask for the account
+        as well when the server supports it.
+        '''
+        if "WHOX" in self.isupport:
+            return ["WHO " + chan.name + " %tcuhnfa," + whoxToken]
+        else:
+            return ["WHO " + chan.name]
+
+    def __whoReply(self, nickName, user, host, account = None):
+        '''Fill in what a WHO or WHOX response says about a nick.'''
+        nick = self.findNick(nickName)
+        if nick is None:
+            return
+
+        self.__updateHost(nick, user + "@" + host)
+        if not account is None:
+            self.__updateAccount(nick, account)
+        debug.info("Processed a WHO response for " + nick.name + "!" + nick.host + ".")
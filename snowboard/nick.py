@@ -21,22 +21,31 @@ See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
 '''
 
 from . import debug
-from .user import User
+from .user import User, noUser
 
 class Nick:
     '''
     Stores information about a nick on the IRC network including hostname and
     privleges associated with the nick in a global sense.
+
+    Nicks not matched to a known user all share noUser, a nick only gets a
+    User of its own once its host matches one.
     '''
+    __slots__ = ("name", "host", "account", "away", "user", "users", "authed", "openWHO",
+                 "pingOut", "pingDest", "sharedChannels")
+
     def __init__(self, nick, users):
         self.name = nick
         self.host = None
-        self.user = User()
+        self.account = None    # Services account, when the server says
+        self.away = False
+        self.user = noUser
         self.users = users
         self.authed = False
         self.openWHO = False
         self.pingOut = 0
         self.pingDest = None
+        self.sharedChannels = 0  # How many of the bot's channels it is in
 
     def auth(self, password):
         '''Authenticates a user against the user database.'''
@@ -71,7 +80,8 @@ class Nick:
 
     def clearPrivs(self):
         '''Clears privleges from the object.'''
-        self.user = User()
+        self.user = noUser
+        self.authed = False
 
     def getUID(self):
         '''Gets the user ID based on the host, only works if host is known'''
@@ -79,7 +89,7 @@ class Nick:
             return None
 
         # Get the UID itself, if one exists.
-        self.user.uid = self.users.matchHost(self.name + "!" + self.host)
+        self.setUID(self.users.matchHost(self.name + "!" + self.host))
 
         return self.user.uid
 
@@ -90,10 +100,22 @@ class Nick:
             thisUser = None
         else:
             thisUser = self.users.userInformation(self.user.uid)
-            self.user = thisUser
+            if thisUser is None:
+                self.user = noUser
+            else:
+                self.user = thisUser
 
         return thisUser
 
+    def setUID(self, uid):
+        '''Sets the user ID of the nick, giving it a User of its own if needed.'''
+        if self.user is noUser:
+            if uid is None:
+                return
+            self.user = User()
+
+        self.user.uid = uid
+
     def sendWHO(self):
         '''Issues a WHO command to establish a hostname for a user.'''
         self.openWHO = True
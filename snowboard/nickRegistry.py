@@ -0,0 +1,150 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+The master list of nicks the bot knows about on a network, indexed by the
+nick folded to lower case the way the server does it, so finding, renaming
+and removing a nick does not mean searching the whole list.
+
+Each nick counts how many of the bot's channels it is in, kept up to date as
+people join, part, are kicked and quit.  A nick in none of them, someone who
+left or who only sent a private message, is moved to a short list of the
+recently seen, the oldest dropped once it is full, so the list never has to
+be swept for nicks that have gone.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+from collections import OrderedDict
+
+from . import caseMapping
+
+class NickRegistry:
+    def __init__(self):
+        self.caseMapping = caseMapping.default
+        self.recentSize = 1000   # Most nicks kept that share no channel
+        self.__nicks = {}        # Folded nick to a Nick sharing a channel
+        self.__recent = OrderedDict() # The same for the rest, oldest first
+        self.__table = caseMapping.tableFor(self.caseMapping)
+
+    def __iter__(self):
+        return iter(list(self.__nicks.values()) + list(self.__recent.values()))
+
+    def __len__(self):
+        return len(self.__nicks) + len(self.__recent)
+
+    def add(self, nick):
+        '''Add a Nick object, replacing any with the same name.'''
+        self.__store(self.fold(nick.name), nick)
+
+    def clear(self):
+        '''Forget every nick.'''
+        self.__nicks.clear()
+        self.__recent.clear()
+
+    def find(self, nickName):
+        '''Returns the Nick object for a nick, or None if it is not known.'''
+        key = self.fold(nickName)
+        nick = self.__nicks.get(key)
+
+        if nick is None:
+            nick = self.__recent.get(key)
+            if not nick is None:
+                self.__recent.move_to_end(key)
+
+        return nick
+
+    def fold(self, nickName):
+        '''Returns a nick folded to lower case by the server's case mapping.'''
+        return caseMapping.fold(nickName, self.__table)
+
+    def joined(self, nick):
+        '''Count one more of the bot's channels a nick is in.'''
+        nick.sharedChannels += 1
+
+        if nick.sharedChannels == 1:
+            key = self.fold(nick.name)
+            if self.__recent.get(key) is nick:
+                del self.__recent[key]
+                self.__nicks[key] = nick
+
+    def left(self, nick):
+        '''
+        Count one less of the bot's channels a nick is in.  A nick left in
+        none of them is only kept among the recently seen, and no longer
+        counts as authenticated since the bot can not see if it goes.
+        '''
+        if nick.sharedChannels == 0:
+            return
+
+        nick.sharedChannels -= 1
+
+        if nick.sharedChannels == 0:
+            key = self.fold(nick.name)
+            nick.authed = False
+            if self.__nicks.get(key) is nick:
+                del self.__nicks[key]
+                self.__store(key, nick)
+
+    def recent(self):
+        '''Returns how many nicks are kept that share no channel with the bot.'''
+        return len(self.__recent)
+
+    def remove(self, nick):
+        '''Remove a Nick object, if it is there.'''
+        key = self.fold(nick.name)
+
+        if self.__nicks.get(key) is nick:
+            del self.__nicks[key]
+        elif self.__recent.get(key) is nick:
+            del self.__recent[key]
+
+    def rename(self, nick, newName):
+        '''Change the name of a Nick object, keeping it indexed.'''
+        self.remove(nick)
+        nick.name = newName
+        self.add(nick)
+
+    def same(self, first, second):
+        '''Checks if two nicks are the same by the server's case mapping.'''
+        return self.fold(first) == self.fold(second)
+
+    def setCaseMapping(self, mapping):
+        '''Use the case mapping the server gave, indexing every nick again.'''
+        if mapping.lower() == self.caseMapping:
+            return
+
+        self.caseMapping = mapping.lower()
+        self.__table = caseMapping.tableFor(self.caseMapping)
+
+        nicks = list(self.__nicks.values()) + list(self.__recent.values())
+        self.clear()
+        for nick in nicks:
+            self.add(nick)
+
+    def __store(self, key, nick):
+        '''
+        File a nick by whether it shares a channel with the bot, dropping the
+        oldest of the recently seen once there are too many.
+        '''
+        self.__nicks.pop(key, None)
+        self.__recent.pop(key, None)
+
+        if nick.sharedChannels > 0:
+            self.__nicks[key] = nick
+        else:
+            self.__recent[key] = nick
+            while len(self.__recent) > self.recentSize:
+                self.__recent.popitem(last = False)
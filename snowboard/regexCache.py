@@ -0,0 +1,49 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Regular expressions that are built at run time, such as those for the
+hostmasks stored with users, kept once compiled so the same pattern is not
+compiled again every time it is used.  Patterns known up front should be
+compiled once when their module is imported instead.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import functools
+import re
+
+@functools.lru_cache(maxsize = 256)
+def compiled(pattern, flags = 0):
+    '''Returns a pattern compiled, only compiling it the first time.'''
+    return re.compile(pattern, flags)
+
+@functools.lru_cache(maxsize = 1024)
+def wildcard(mask):
+    '''
+    Returns a wildcard mask, such as nick!*@*.example.com, compiled into a
+    regular expression that matches in any case.  A * stands for any run of
+    characters and a ? for at most one, anything else is taken as it is.
+    '''
+    pattern = []
+    for char in mask:
+        if char == '*':
+            pattern.append(".*")
+        elif char == '?':
+            pattern.append(".?")
+        else:
+            pattern.append(re.escape(char))
+
+    return re.compile("".join(pattern), re.IGNORECASE)
@@ -27,28 +27,50 @@ from . import scriptname
 Where scriptname imports "scriptname.py".
 
 Once the module is imported it can then be used like any other.
+
+Triggers return a list of commands to be sent to the server.  A trigger that
+has to wait on something slow can be written with "async def" instead, it is
+then run by the network and the commands it returns are sent once it is done.
+Pass every result through __collect so both kinds work.
+
+Scripts with commands or patterns to trigger on in channels or in private
+messages declare them in a registerTriggers function, called below, see
+triggers.py.
+
+Scripts that need to see messages from the server as they are, by command or
+numeric, register a handler for them in registerHandlers, see dispatch.py.
 '''
 
+import inspect
+
 from . import basicCommands
 from . import userCommands
 from . import seenCommands
 from . import channelCommands
 from . import RPCommands
+from .triggers import Triggers
+
+# The commands and patterns scripts trigger on, in channels and in private.
+channelTriggers = Triggers()
+privateTriggers = Triggers()
+
+basicCommands.registerTriggers(channelTriggers, privateTriggers)
+userCommands.registerTriggers(channelTriggers, privateTriggers)
+seenCommands.registerTriggers(channelTriggers, privateTriggers)
+channelCommands.registerTriggers(channelTriggers, privateTriggers)
 
 def channelScripts(ircMsg):
     '''Executes scripts that should trigger from channel content.'''
     cmds = []
-    cmds += basicCommands.channelTriggers(ircMsg)
-    cmds += seenCommands.chanTriggers(ircMsg)
-    cmds += channelCommands.channelTriggers(ircMsg)
+    for result in channelTriggers.run(ircMsg):
+        cmds += __collect(ircMsg.net, result)
     return cmds
 
 def messageScripts(ircMsg):
     '''Executes scripts that should trigger from private message content.'''
     cmds = []
-    cmds += basicCommands.msgTriggers(ircMsg)
-    cmds += userCommands.msgTriggers(ircMsg)
-    cmds += channelCommands.msgTriggers(ircMsg)
+    for result in privateTriggers.run(ircMsg):
+        cmds += __collect(ircMsg.net, result)
     return cmds
 
 def privActionScripts(ircMsg):
@@ -61,7 +83,7 @@ def privActionScripts(ircMsg):
 def privNoticeScripts(ircMsg):
     '''Executes scripts that should be triggered by a private notice message.'''
     cmds = []
-    cmds += basicCommands.noticeTriggers(ircMsg)
+    cmds += __collect(ircMsg.net, basicCommands.noticeTriggers(ircMsg))
     return cmds
 
 
@@ -82,15 +104,15 @@ def chanNoticeScripts(ircMsg):
 def ctcpScripts(ircMsg):
     '''Executes scripts that should be triggered by a CTCP message.'''
     cmds = []
-    cmds += basicCommands.ctcpTriggers(ircMsg)
+    cmds += __collect(ircMsg.net, basicCommands.ctcpTriggers(ircMsg))
     return cmds
 
 
 def joinScripts(ircMsg):
     '''Processes script triggers based on channel joins.'''
     cmds = []
-    cmds += basicCommands.joinTrigger(ircMsg)
-    cmds += RPCommands.joinTriggers(ircMsg)
+    cmds += __collect(ircMsg.net, basicCommands.joinTrigger(ircMsg))
+    cmds += __collect(ircMsg.net, RPCommands.joinTriggers(ircMsg))
     return cmds
 
 
@@ -100,11 +122,9 @@ def partScripts(ircMsg):
 
     return cmds
 
-def rawMessages(net, message):
-    '''Executes scripts that process raw messages from the server.'''
-    cmds = []
-    seenCommands.rawTriggers(net, message)
-    return cmds
+def registerHandlers(responses):
+    '''Registers the scripts that handle messages from the server directly.'''
+    responses.register(seenCommands.rawCommands, seenCommands.rawTriggers)
 
 
 def timers(net, time):
@@ -113,6 +133,16 @@ def timers(net, time):
 
     # 5 Minute Timer
     if (round(time) % 300) == 0:
-        cmds += channelCommands.resetTopics(net)
+        cmds += __collect(net, channelCommands.resetTopics(net))
+
+    return cmds
+
+def __collect(net, result):
+    '''Hands asynchronous trigger results to the network to be run.'''
+    if inspect.isawaitable(result):
+        net.defer(result)
+        result = []
+    elif result is None:
+        result = []
 
-    return cmds
\ No newline at end of file
+    return result
\ No newline at end of file
@@ -164,17 +164,20 @@ class Seen:
 
         return result
 
-    def save(self, nick, host, act):
+    def save(self, nick, host, act, when = None):
         '''Save a nick, host, and action to the DB'''
         self.saveNick(nick, host)
         self.saveHost(nick, host)
-        self.saveAction(nick, host, act)
+        self.saveAction(nick, host, act, when)
 
-    def saveAction(self, nick, host, act):
-        '''Saves the action and time for a user.'''
+    def saveAction(self, nick, host, act, when = None):
+        '''Saves the action and the time it happened, or now, for a user.'''
         self.__openDB()
 
-        data = [act, time.time()]
+        if when is None:
+            when = time.time()
+
+        data = [act, when]
 
         nickQuery = "UPDATE hosts SET act = ?, time = ? WHERE nick IS '" + nick.lower() + "'"
         hostQuery = "UPDATE nicks SET act = ?, time = ? WHERE host IS '" + host.lower() + "'"
@@ -17,87 +17,67 @@
 Processes triggers for the seen module.
 '''
 
-import re
 import datetime
 import time
 from .seen import Seen
+from .network import whoxToken
 
-def chanTriggers(ircMsg):
-    '''Processes channel queries for the seen module.'''
-    commands = []
-
-    if ircMsg.dataList[0].lower() == "^seen":
-        commands = __seenQuery(ircMsg)
-    if ircMsg.dataList[0].lower() == "^trace" and ircMsg.dataList[1].lower() == "nick":
-        commands = __traceNick(ircMsg)
+# Messages from the server that tell us where a nick has been.
+rawCommands = ("JOIN", "NICK", "PART", "PRIVMSG", "QUIT", "352", "353", "354")
 
-    return commands
+# Replies from the server, rather than a user, that say a nick is online.
+onlineCommands = ("352", "353", "354")
 
 def rawTriggers(net, message):
     '''Processes raw message triggers.'''
-    dbTriggerA = r"^(.*)!(.*@.*) (PRIVMSG|PART) (#.*) :(.*)$"
-    dbTriggerB = r"^(.*)!(.*@.*) (QUIT|NICK) :(.*)$"
-    dbTriggerC = r"^(.*)!(.*@.*) (JOIN|PART) (#.*)$"
+    command = message.command
+    params = message.params
+    host = message.userHost()
 
-    searchA = re.compile(dbTriggerA, re.IGNORECASE)
-    searchB = re.compile(dbTriggerB, re.IGNORECASE)
-    searchC = re.compile(dbTriggerC, re.IGNORECASE)
+    # Only messages from users, or WHO replies, say anything about a nick.
+    if host == "" and not command in onlineCommands:
+        return
 
     seen = Seen(net.name)
 
-    if searchA.match(message):
-        # Process joins and parts that have messages.
-        data = searchA.split(message)
-
-        nick = data[1]
-        host = data[2]
-        dest = data[4]
-        msg = data[5]
-
-        if data[3] == "PRIVMSG":
-            act = "on " + dest + " saying '" + msg + "'"
-        elif data[3] == "PART":
-            act = "leaving " + dest + " with message '" + msg + "'"
-
-        seen.save(nick, host, act)
-    elif searchB.match(message):
-        # Process quit and nick messages.
-        data = searchB.split(message)
-
-        nick = data[1]
-        host = data[2]
-        msg = data[4]
-
-        if msg == "QUIT":
-            act = "leaving IRC with message '" + msg + "'"
-            seen.save(nick, host, act)
-        elif msg == "NICK":
-            act = "changing nick to '" + msg + "'"
-            seen.save(nick, host, act)
-            act = "changing nick from '" + nick + "'"
-            seen.save(msg, host, act)
-
-    elif searchC.match(message):
-        data = searchC.split(message)
-
-        nick = data[1]
-        host = data[2]
-        dest = data[4]
-
-        if data[3] == "JOIN":
-            act = "joining " + dest
-        elif data[3] == "PART":
-            act = "leaving " + dest
-
-        seen.save(nick, host, act)
-    else:
-        messageList = message.split()
-        if messageList[1] == "352":
-            host = messageList[4] + "@" + messageList[5]
-            nick = messageList[7]
-            act = "online"
-            seen.save(nick, host, act)
-    return
+    # Played back history carries the time it really happened.
+    when = message.when()
+
+    if command == "PRIVMSG" and len(params) > 1 and net.isChannel(params[0]):
+        seen.save(message.nick, host, "on " + params[0] + " saying '" + params[1] + "'", when)
+    elif command == "PART" and len(params) > 0 and net.isChannel(params[0]):
+        # Process parts, with or without messages.
+        if len(params) > 1:
+            act = "leaving " + params[0] + " with message '" + params[1] + "'"
+        else:
+            act = "leaving " + params[0]
+        seen.save(message.nick, host, act, when)
+    elif command == "JOIN" and len(params) > 0 and net.isChannel(params[0]):
+        seen.save(message.nick, host, "joining " + params[0], when)
+    elif command == "QUIT":
+        seen.save(message.nick, host, "leaving IRC with message '" + message.text(0) + "'", when)
+    elif command == "NICK" and len(params) > 0:
+        # Process nick changes, for both the old and the new nick.
+        seen.save(message.nick, host, "changing nick to '" + params[0] + "'", when)
+        seen.save(params[0], host, "changing nick from '" + message.nick + "'", when)
+    elif command == "352" and len(params) > 5:
+        seen.save(params[5], params[2] + "@" + params[3], "online", when)
+    elif command == "353" and len(params) > 3:
+        # With userhost-in-names the names come as nick!user@host, and no
+        # WHO is sent for the channel.
+        prefixes = net.prefixes()
+        for name in params[3].split():
+            nick, bang, nickHost = name.lstrip(prefixes).partition('!')
+            if bang:
+                seen.save(nick, nickHost, "online", when)
+    elif command == "354" and len(params) > 5 and params[1] == whoxToken:
+        # WHOX replies to the %tcuhnfa query sent for a channel.
+        seen.save(params[5], params[3] + "@" + params[4], "online", when)
+
+def registerTriggers(channel, private):
+    '''Declares the channel queries for the seen module.'''
+    channel.addCommand("^seen", __seenQuery)
+    channel.addCommand("^trace", __traceQuery)
 
 def __removeItem(list, text):
     '''Removes an string from a list, not paying attention to case.'''
@@ -131,10 +111,14 @@ def __seenQuery(ircMsg):
                 else:
                     ago = str(delta)
 
+                # Nicks only recently seen share no channel with the bot, and
+                # may well have gone.
+                isHere = None
                 for nick in nicks:
                     isHere = ircMsg.net.findNick(nick)
-                    if not (isHere is None):
+                    if (not (isHere is None)) and isHere.sharedChannels > 0:
                         break
+                    isHere = None
 
                 if isHere is None:
                     if lastNick.lower() == ircMsg.dataList[1].lower():
@@ -244,4 +228,11 @@ def __traceNick(ircMsg):
     else:
         commands.append("PRIVMSG " + ircMsg.dest + " :I'm not sure what you're asking me to do.")
 
-    return commands
\ No newline at end of file
+    return commands
+
+def __traceQuery(ircMsg):
+    '''Processes a ^trace query, only nicks can be traced so far.'''
+    if len(ircMsg.dataList) > 1 and ircMsg.dataList[1].lower() == "nick":
+        return __traceNick(ircMsg)
+    else:
+        return []
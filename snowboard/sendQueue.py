@@ -0,0 +1,251 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+The queue of lines waiting to be sent to the server, split into lanes by
+priority.  Protocol lines (PONG, NICK, JOIN and the like) always go first, so
+the connection is never lost behind a long reply.  Interactive lines, replies
+to people, go next, and bulk lines (files, WHO lookups) go last.  So bulk
+lines are not held back forever while the bot is busy, one is let through
+after every "share" interactive lines.
+
+Inside the interactive and bulk lanes each target (channel or nick) has a
+queue of its own, and the targets take turns, so one person asking for a long
+reply only slows down their own replies.  The protocol lane is kept strictly
+in order, since the server expects its commands in the order they were sent.
+
+Some commands only need to be sent once however many times they are asked
+for, a WHO for the same nick for example.  An index of those waiting to be
+sent lets a repeat be spotted without searching the queue.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+from collections import OrderedDict, deque
+
+PROTOCOL = 0
+INTERACTIVE = 1
+BULK = 2
+
+laneNames = ("protocol", "interactive", "bulk")
+
+# Commands the connection itself depends on.
+protocolCommands = ("AUTHENTICATE", "CAP", "JOIN", "NICK", "PASS", "PING", "PONG", "QUIT", "USER")
+
+# Commands only sent to keep the bot's own records up to date.
+bulkCommands = ("WHO",)
+
+# Commands where a second copy waiting to be sent is of no use.
+coalescableCommands = ("WHO",)
+
+def coalesceKey(command):
+    '''
+    Returns the key a command is indexed under if a repeat of it can be
+    dropped, or None if every copy has to be sent.
+    '''
+    words = command.split(' ', 1)
+    word = words[0].upper()
+
+    if word in coalescableCommands:
+        if len(words) > 1:
+            return word + " " + words[1].lower()
+        else:
+            return word
+    else:
+        return None
+
+def laneFor(command):
+    '''Works out which lane a command belongs in.'''
+    word = command.split(' ', 1)[0].upper()
+
+    if word in protocolCommands:
+        return PROTOCOL
+    elif word in bulkCommands:
+        return BULK
+    else:
+        return INTERACTIVE
+
+def targetOf(command):
+    '''Works out who a command is sent to, the channel or nick after it.'''
+    words = command.split(' ', 2)
+
+    if len(words) > 1:
+        return words[1].lower()
+    else:
+        return ""
+
+class Lane:
+    '''
+    A single lane of the queue, holding a queue for every target.  In a fair
+    lane the targets take turns, otherwise every line shares one queue.
+    '''
+    def __init__(self, fair):
+        self.fair = fair
+        self.targets = OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        '''Throw away everything in the lane.'''
+        self.targets.clear()
+        self.size = 0
+
+    def drop(self, target):
+        '''Throw away the lines waiting for a target, returns them.'''
+        if not self.fair:
+            return []
+
+        dropped = self.targets.pop(target, [])
+        self.size -= len(dropped)
+
+        return dropped
+
+    def head(self):
+        '''Returns the entry that will be taken next.'''
+        for queued in self.targets.values():
+            return queued[0]
+
+    def pop(self):
+        '''Takes the next entry, then lets the next target have a turn.'''
+        target, queued = next(iter(self.targets.items()))
+        entry = queued.popleft()
+        self.size -= 1
+
+        if len(queued) == 0:
+            del self.targets[target]
+        elif self.fair:
+            self.targets.move_to_end(target)
+
+        return entry
+
+    def push(self, entry, target):
+        '''Adds an entry to the end of a target's queue.'''
+        if not self.fair:
+            target = ""
+
+        if target in self.targets:
+            self.targets[target].append(entry)
+        else:
+            self.targets[target] = deque([entry])
+        self.size += 1
+
+class SendQueue:
+    def __init__(self):
+        self.lanes = []
+        self.peaks = []        # Deepest each lane has been
+        self.share = 4         # Interactive lines sent per waiting bulk line
+        self.__pending = set() # Keys of coalescable commands waiting
+        self.__served = 0      # Interactive lines sent while bulk waited
+
+        for index, name in enumerate(laneNames):
+            self.lanes.append(Lane(index != PROTOCOL))
+            self.peaks.append(0)
+
+    def __len__(self):
+        total = 0
+        for lane in self.lanes:
+            total += len(lane)
+
+        return total
+
+    def clear(self):
+        '''Throw away everything waiting to be sent.'''
+        for lane in self.lanes:
+            lane.clear()
+        self.__pending.clear()
+        self.__served = 0
+
+    def depths(self):
+        '''Returns how many lines are waiting in each lane.'''
+        depths = {}
+        for index, name in enumerate(laneNames):
+            depths[name] = len(self.lanes[index])
+
+        return depths
+
+    def drop(self, target):
+        '''
+        Throw away the lines waiting for a channel or nick that has gone,
+        returns how many were dropped.
+        '''
+        dropped = 0
+        for lane in self.lanes:
+            for command, queuedAt in lane.drop(target.lower()):
+                self.__pending.discard(coalesceKey(command))
+                dropped += 1
+
+        return dropped
+
+    def peek(self):
+        '''Returns the next (command, queuedAt) to send, or None if empty.'''
+        lane = self.__nextLane()
+
+        if lane is None:
+            return None
+        else:
+            return self.lanes[lane].head()
+
+    def pop(self):
+        '''Takes the next (command, queuedAt) to send off the queue.'''
+        lane = self.__nextLane()
+
+        if lane is None:
+            return None
+
+        # Keep track of how long bulk lines have been kept waiting.
+        if lane == INTERACTIVE and len(self.lanes[BULK]) > 0:
+            self.__served += 1
+        elif lane == BULK:
+            self.__served = 0
+
+        entry = self.lanes[lane].pop()
+        self.__pending.discard(coalesceKey(entry[0]))
+
+        return entry
+
+    def push(self, command, lane, queuedAt):
+        '''
+        Adds a command to the end of its target's queue in a lane.  Returns
+        False, without adding it, if a copy of a coalescable command is
+        already waiting.
+        '''
+        key = coalesceKey(command)
+        if not key is None:
+            if key in self.__pending:
+                return False
+            self.__pending.add(key)
+
+        self.lanes[lane].push((command, queuedAt), targetOf(command))
+
+        if len(self.lanes[lane]) > self.peaks[lane]:
+            self.peaks[lane] = len(self.lanes[lane])
+
+        return True
+
+    def __nextLane(self):
+        '''Picks the lane the next line comes from.'''
+        if len(self.lanes[PROTOCOL]) > 0:
+            return PROTOCOL
+        elif len(self.lanes[INTERACTIVE]) > 0:
+            if len(self.lanes[BULK]) > 0 and self.__served >= self.share:
+                return BULK
+            else:
+                return INTERACTIVE
+        elif len(self.lanes[BULK]) > 0:
+            return BULK
+        else:
+            return None
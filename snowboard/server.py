@@ -26,4 +26,44 @@ class Server:
     def __init__(self, host, port, ssl):
         self.host = host
         self.port = port
-        self.ssl = ssl
\ No newline at end of file
+        self.ssl = ssl
+        self.failures = 0      # Failed connection attempts in a row
+        self.latency = []      # Recent connection times, in seconds
+        self.historySize = 5
+        self.resumed = False   # If the last connection resumed a TLS session
+        self.session = None    # TLS session to resume when reconnecting
+
+    def average(self):
+        '''Returns the average connection time, or None if never connected.'''
+        if len(self.latency) == 0:
+            return None
+        else:
+            return sum(self.latency) / len(self.latency)
+
+    def rank(self):
+        '''
+        Returns a key to sort servers by, so the fastest healthy server comes
+        first, then servers never tried, then servers that have been failing.
+        '''
+        average = self.average()
+
+        if self.failures > 0:
+            return (2, self.failures)
+        elif average is None:
+            return (1, 0)
+        else:
+            return (0, average)
+
+    def recordConnect(self, elapsed, resumed = False):
+        '''
+        Records how long a successful connection took, and if it was able to
+        resume an earlier TLS session.
+        '''
+        self.failures = 0
+        self.resumed = resumed
+        self.latency.append(elapsed)
+        self.latency = self.latency[-self.historySize:]
+
+    def recordFailure(self):
+        '''Records a failed connection attempt.'''
+        self.failures += 1
\ No newline at end of file
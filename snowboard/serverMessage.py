@@ -0,0 +1,232 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+A line from the server, parsed once into its parts following RFC 1459 and
+the IRCv3 message tags specification:
+
+[@tags] [:prefix] command [params ...] [:trailing]
+
+Every part of the bot works from the same parsed message, which can not be
+changed once made.  Tags are kept as the text they arrived as until one is
+asked for, so a line nobody looks at the tags of costs nothing more.  The
+server-time tag, when the server sends it, gives the time the message was
+actually sent, which matters for history played back after a reconnect.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import calendar
+import time
+
+# How the characters not allowed in a tag value are escaped.
+tagEscapes = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+def unescapeTag(value):
+    '''Turns an escaped tag value back into what it stands for.'''
+    if not "\\" in value:
+        return value
+
+    result = []
+    escaped = False
+    for char in value:
+        if escaped:
+            result.append(tagEscapes.get(char, char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            result.append(char)
+
+    # A backslash at the very end escapes nothing and is dropped.
+    return "".join(result)
+
+def parseServerTime(value):
+    '''
+    Turns a server-time value, such as 2011-10-19T16:40:51.620Z, into seconds
+    since the epoch, returns None if it can not be read.
+    '''
+    stamp, dot, fraction = value.rstrip("Z").partition(".")
+
+    try:
+        seconds = calendar.timegm(time.strptime(stamp, "%Y-%m-%dT%H:%M:%S"))
+        if fraction:
+            seconds += float("0." + fraction)
+    except ValueError:
+        return None
+
+    return seconds
+
+class ServerMessage:
+    __slots__ = ("raw", "tagText", "prefix", "nick", "user", "host", "command", "params",
+                 "trailing", "__tags")
+
+    def __init__(self, raw, tagText, prefix, command, params, trailing = None):
+        setValue = object.__setattr__
+
+        setValue(self, "raw", raw)             # The line, without any tags
+        setValue(self, "tagText", tagText)     # Tags as sent, without the '@'
+        setValue(self, "_ServerMessage__tags", None)
+        setValue(self, "prefix", prefix)       # Who sent it, None if not given
+        setValue(self, "command", command)
+        setValue(self, "params", tuple(params))
+        setValue(self, "trailing", trailing)   # Last parameter, if given with ':'
+
+        # Split nick!user@host, a server only has a name.
+        nick = prefix
+        user = None
+        host = None
+
+        if not prefix is None:
+            nick, bang, userHost = prefix.partition('!')
+            if bang:
+                user, at, host = userHost.partition('@')
+            else:
+                nick, at, host = prefix.partition('@')
+                if not at:
+                    host = None
+
+        setValue(self, "nick", nick)
+        setValue(self, "user", user)
+        setValue(self, "host", host)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("A ServerMessage can not be changed.")
+
+    def __delattr__(self, name):
+        raise AttributeError("A ServerMessage can not be changed.")
+
+    def __repr__(self):
+        return "ServerMessage(" + repr(self.raw) + ")"
+
+    @classmethod
+    def parse(cls, line):
+        '''Parse a line from the server, returns None for a blank line.'''
+        line = line.strip('\r\n')
+        tagText = ""
+        prefix = None
+        trailing = None
+
+        # Tags are only split up when they are asked for.
+        if line.startswith('@'):
+            tagText, space, line = line[1:].partition(' ')
+
+        line = line.lstrip(' ')
+        raw = line
+
+        if line.startswith(':'):
+            prefix, space, line = line[1:].partition(' ')
+            line = line.lstrip(' ')
+
+        # The trailing parameter is everything after the first " :".
+        if line.startswith(':'):
+            line, trailing = "", line[1:]
+        else:
+            line, separator, rest = line.partition(' :')
+            if separator:
+                trailing = rest
+
+        words = line.split()
+        if len(words) == 0:
+            return None
+
+        params = words[1:]
+        if not trailing is None:
+            params.append(trailing)
+
+        return cls(raw, tagText, prefix, words[0].upper(), params, trailing)
+
+    def param(self, index, default = ""):
+        '''Returns a parameter, or the default if there are not that many.'''
+        if index < len(self.params):
+            return self.params[index]
+        else:
+            return default
+
+    def serverTime(self):
+        '''
+        Returns when the server says the message was sent, in seconds since
+        the epoch, or None if it did not say.
+        '''
+        value = self.tag("time")
+
+        if value is None:
+            return None
+        else:
+            return parseServerTime(value)
+
+    def tag(self, name, default = None):
+        '''
+        Returns the value of a tag, unescaped, "" for a tag without a value
+        or the default if the tag was not sent.
+        '''
+        if self.tagText == "":
+            return default
+
+        value = self.__tagValues().get(name)
+        if value is None:
+            return default
+        else:
+            return unescapeTag(value)
+
+    @property
+    def tags(self):
+        '''All the tags sent, names and unescaped values.'''
+        tags = {}
+        for key, value in self.__tagValues().items():
+            tags[key] = unescapeTag(value)
+
+        return tags
+
+    def text(self, start = 1):
+        '''Returns the parameters from start on, joined back into text.'''
+        return " ".join(self.params[start:])
+
+    def userHost(self):
+        '''Returns user@host for a message from a user, otherwise "".'''
+        if self.user is None or self.host is None:
+            return ""
+        else:
+            return self.user + "@" + self.host
+
+    def when(self):
+        '''Returns when the message was sent, by server-time if given or now.'''
+        sent = self.serverTime()
+
+        if sent is None:
+            return time.time()
+        else:
+            return sent
+
+    def withCommand(self, command, params):
+        '''Returns a copy of the message with a new command and parameters.'''
+        if len(params) > 1:
+            trailing = params[-1]
+        else:
+            trailing = None
+
+        return ServerMessage(self.raw, self.tagText, self.prefix, command, params, trailing)
+
+    def __tagValues(self):
+        '''Splits the tags up the first time they are needed, still escaped.'''
+        if self.__tags is None:
+            tags = {}
+            for tag in self.tagText.split(';'):
+                if not tag == "":
+                    key, equals, value = tag.partition('=')
+                    tags[key] = value
+            object.__setattr__(self, "_ServerMessage__tags", tags)
+
+        return self.__tags
@@ -0,0 +1,216 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Connects to several servers, and to every address each of them resolves to,
+at the same time.  The first to complete its TCP and TLS handshakes wins, the
+rest are closed.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import errno
+import os
+import selectors
+import socket
+import ssl
+import time
+
+from . import debug
+from .connection import createContext
+
+class Attempt:
+    '''A single non-blocking connection attempt to one address.'''
+    def __init__(self, server, address):
+        self.server = server
+        self.family, self.type, self.proto, canonName, self.address = address
+        self.sock = None
+        self.handshaking = False
+        self.start = 0
+
+class ServerRace:
+    def __init__(self, servers, sslVerify = True):
+        self.servers = servers
+        self.sslVerify = sslVerify
+        self.timeout = 30    # How long the whole race may take
+        self.width = 3       # How many attempts may run at once
+        self.context = None  # SSL context, shared by the whole network
+        self.selector = None
+
+    def run(self):
+        '''
+        Race the servers, returning (server, socket, elapsed) for the winner,
+        or None if every attempt failed.
+        '''
+        waiting = self.__resolve()
+        running = []
+        failed = []
+        winner = None
+        deadline = time.time() + self.timeout
+
+        self.selector = selectors.DefaultSelector()
+
+        while (winner is None) and (len(waiting) > 0 or len(running) > 0):
+            # Keep as many attempts going as allowed.
+            while len(waiting) > 0 and len(running) < self.width:
+                attempt = waiting.pop(0)
+                if self.__start(attempt):
+                    running.append(attempt)
+                else:
+                    failed.append(attempt)
+
+            # Never wait on an empty selector, it would sit out the whole
+            # timeout when every attempt failed at once.
+            if len(running) == 0:
+                continue
+
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                debug.error("Connection attempts timed out.")
+                break
+
+            for key, mask in self.selector.select(timeout):
+                attempt = key.data
+                if not attempt in running:
+                    continue
+
+                try:
+                    done = self.__advance(attempt)
+                except (OSError, ssl.SSLError) as err:
+                    debug.error("Connection to " + attempt.server.host + " (" + str(attempt.address[0]) + ") failed: " + str(err))
+                    self.__close(attempt)
+                    running.remove(attempt)
+                    failed.append(attempt)
+                    continue
+
+                if done:
+                    winner = attempt
+                    running.remove(attempt)
+                    break
+
+        # Cancel everything still going.
+        for attempt in running:
+            self.__close(attempt)
+
+        self.selector.close()
+        self.selector = None
+
+        # A server only counts as failed if none of its addresses worked.
+        others = running + waiting
+        if not winner is None:
+            others.append(winner)
+        self.__recordFailures(failed, others)
+
+        if winner is None:
+            return None
+
+        elapsed = time.time() - winner.start
+        return (winner.server, winner.sock, elapsed)
+
+    def __advance(self, attempt):
+        '''Move an attempt on a step, returns True once it is connected.'''
+        if not attempt.handshaking:
+            error = attempt.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if error != 0:
+                raise OSError(error, "connect failed")
+
+            if not attempt.server.ssl:
+                self.selector.unregister(attempt.sock)
+                return True
+
+            # The TCP connection is up, start on the TLS handshake.
+            self.selector.unregister(attempt.sock)
+            attempt.sock = self.__wrap(attempt)
+            attempt.handshaking = True
+            self.selector.register(attempt.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, attempt)
+
+        try:
+            attempt.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            self.selector.modify(attempt.sock, selectors.EVENT_READ, attempt)
+            return False
+        except ssl.SSLWantWriteError:
+            self.selector.modify(attempt.sock, selectors.EVENT_WRITE, attempt)
+            return False
+
+        self.selector.unregister(attempt.sock)
+        return True
+
+    def __close(self, attempt):
+        '''Abandon an attempt.'''
+        if not attempt.sock is None:
+            try:
+                self.selector.unregister(attempt.sock)
+            except (KeyError, ValueError):
+                pass
+            attempt.sock.close()
+            attempt.sock = None
+
+    def __recordFailures(self, failed, others):
+        '''Record a failure against servers where every attempt failed.'''
+        spared = [attempt.server for attempt in others]
+        counted = []
+
+        for attempt in failed:
+            if not (attempt.server in spared or attempt.server in counted):
+                attempt.server.recordFailure()
+                counted.append(attempt.server)
+
+    def __resolve(self):
+        '''Build the list of attempts, every address of every server.'''
+        attempts = []
+
+        for server in self.servers:
+            try:
+                addresses = socket.getaddrinfo(server.host, server.port, type = socket.SOCK_STREAM)
+            except socket.gaierror:
+                debug.error("Failed to resolve " + server.host + ".")
+                server.recordFailure()
+                continue
+
+            for address in addresses:
+                attempts.append(Attempt(server, address))
+
+        return attempts
+
+    def __start(self, attempt):
+        '''Begin a non-blocking connect, returns False if it failed at once.'''
+        debug.message("Attempting connection to " + attempt.server.host + ":" + str(attempt.server.port) +
+                      " (" + str(attempt.address[0]) + ").")
+        attempt.start = time.time()
+
+        try:
+            attempt.sock = socket.socket(attempt.family, attempt.type, attempt.proto)
+            attempt.sock.setblocking(False)
+            error = attempt.sock.connect_ex(attempt.address)
+            if not error in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                raise OSError(error, os.strerror(error))
+            self.selector.register(attempt.sock, selectors.EVENT_WRITE, attempt)
+        except OSError as err:
+            debug.error("Connection to " + attempt.server.host + " failed: " + str(err))
+            if not attempt.sock is None:
+                attempt.sock.close()
+                attempt.sock = None
+            return False
+
+        return True
+
+    def __wrap(self, attempt):
+        '''Wrap a connected socket for TLS, without doing the handshake yet.'''
+        if self.context is None:
+            self.context = createContext(self.sslVerify)
+
+        return self.context.wrap_socket(attempt.sock, do_handshake_on_connect = False,
+                                        session = attempt.server.session)
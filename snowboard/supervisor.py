@@ -0,0 +1,62 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Runs several networks from one process, each on its own task in a single
+asyncio event loop.  Every Network keeps its own connection, flood control,
+reconnect state and databases, so a network that is slow or reconnecting
+does not hold up the others.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import asyncio
+
+from . import debug
+
+class Supervisor:
+    def __init__(self, networks, runner):
+        self.networks = networks
+        self.runner = runner     # Coroutine function that drives one network
+        self.restartDelay = 5    # Wait before restarting a failed network
+
+    async def run(self):
+        '''Run every network until they have all quit.'''
+        debug.message("Starting " + str(len(self.networks)) + " networks.")
+
+        tasks = []
+        for net in self.networks:
+            tasks.append(asyncio.ensure_future(self.__supervise(net)))
+
+        results = await asyncio.gather(*tasks)
+
+        return max(results)
+
+    async def __supervise(self, net):
+        '''Keep a single network running, restarting it if it fails.'''
+        while True:
+            try:
+                return await self.runner(net)
+            except Exception as err:
+                debug.error("Network " + net.name + " stopped unexpectedly: " + repr(err))
+
+            if net.online():
+                net.disconnect()
+
+            if not net.reconnect:
+                return 1
+
+            debug.message("Restarting network " + net.name + " in " + str(self.restartDelay) + " seconds.")
+            await asyncio.sleep(self.restartDelay)
@@ -0,0 +1,93 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+An index of the triggers scripts offer for a kind of message, so that each
+message is only looked at once however many scripts there are.
+
+Scripts declare their triggers up front, either a command, the first word of
+the message such as "^seen" or "adduser", or a pattern, a regular expression
+matched against the whole message.  Commands are found with a single lookup
+on the first word.  The patterns are joined into one expression, so they are
+all tried in one scan, with the bot's nick filled in wherever a pattern has
+{botnick}.
+
+Joining the patterns has two rules that come with it.  Patterns never care
+about case, and at most one of them fires for a message, the one that
+matches earliest in the message, or the one added first if several match at
+the same place.  Patterns that could overlap belong in a single trigger.
+
+A trigger is called with the ircMessage and returns what a script trigger
+always has, a list of commands or an awaitable giving one.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import re
+
+from . import regexCache
+
+class Triggers:
+    def __init__(self):
+        self.commands = {}       # First word, in lower case, to its trigger
+        self.patterns = []       # (pattern, trigger) in the order added
+        self.__compiled = {}     # Bot nick to the joined patterns for it
+
+    def addCommand(self, word, trigger):
+        '''Add a trigger for messages starting with a word, in any case.'''
+        self.commands[word.lower()] = trigger
+
+    def addPattern(self, pattern, trigger):
+        '''
+        Add a trigger for messages a regular expression is found in, matched
+        without regard to case.  Only one pattern trigger fires a message.
+        '''
+        self.patterns.append((pattern, trigger))
+        self.__compiled.clear()
+
+    def run(self, ircMsg):
+        '''
+        Calls the triggers a message sets off, its command trigger and the
+        first pattern found in it, returns a list of what each gave back.
+        '''
+        results = []
+
+        if len(ircMsg.dataList) > 0:
+            trigger = self.commands.get(ircMsg.dataList[0].lower())
+            if not trigger is None:
+                results.append(trigger(ircMsg))
+
+        if len(self.patterns) > 0:
+            found = self.__search(ircMsg.net.botnick).search(ircMsg.data)
+            if not found is None:
+                index = int(found.lastgroup[1:])
+                results.append(self.patterns[index][1](ircMsg))
+
+        return results
+
+    def __search(self, botnick):
+        '''Returns the patterns joined into one expression for a bot nick.'''
+        search = self.__compiled.get(botnick)
+
+        if search is None:
+            choices = []
+            for index, (pattern, trigger) in enumerate(self.patterns):
+                pattern = pattern.replace("{botnick}", re.escape(botnick))
+                choices.append("(?P<p" + str(index) + ">" + pattern + ")")
+
+            search = regexCache.compiled("|".join(choices), re.IGNORECASE)
+            self.__compiled[botnick] = search
+
+        return search
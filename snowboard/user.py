@@ -20,11 +20,13 @@ See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
 '''
 
 from . import passwordTools
-from .userFlags import UserFlags
+from .userFlags import UserFlags, EmptyFlags
 from .userChannel import UserChannel
 
 class User:
     '''A place to store the complete privleges of a single user.'''
+    __slots__ = ("uid", "user", "pwHash", "hostmasks", "level", "flags", "channels")
+
     def __init__(self):
         self.uid = None
         self.user = None
@@ -123,4 +125,37 @@ class User:
         if passwordTools.passwordHash(password) == self.pwHash:
             result = True
 
-        return result
\ No newline at end of file
+        return result
+
+class EmptyUser(User):
+    '''
+    The user for every nick the bot does not know, shared by all of them, so
+    it can not be changed.
+    '''
+    __slots__ = ()
+
+    def __init__(self):
+        setValue = object.__setattr__
+
+        setValue(self, "uid", None)
+        setValue(self, "user", None)
+        setValue(self, "pwHash", None)
+        setValue(self, "hostmasks", ())
+        setValue(self, "level", 0)
+        setValue(self, "flags", EmptyFlags())
+        setValue(self, "channels", ())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The empty user is shared and can not be changed.")
+
+    def __delattr__(self, name):
+        raise AttributeError("The empty user is shared and can not be changed.")
+
+    def loadChannels(self, data):
+        raise AttributeError("The empty user is shared and can not be changed.")
+
+    def loadHostmasks(self, data):
+        raise AttributeError("The empty user is shared and can not be changed.")
+
+# Shared by every nick that is not a known user.
+noUser = EmptyUser()
@@ -23,6 +23,8 @@ from .userFlags import UserFlags
 
 class UserChannel:
     '''A place to store complete privleges for a user on a channel.'''
+    __slots__ = ("name", "level", "flags")
+
     def __init__(self):
         self.name = None
         self.level = 0
@@ -26,32 +26,18 @@ from .user import User
 from .userChannel import UserChannel
 from .userFlags import UserFlags
 
-def msgTriggers(ircMsg):
-    '''Process triggers for user commands.'''
-    commands = []
-
-    if ircMsg.dataList[0].lower() == "init" and ircMsg.net.config.init > 0:
-        commands = __initCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "addhost":
-        commands = __addHost(ircMsg)
-    elif ircMsg.dataList[0].lower() == "adduser":
-        commands = __addCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "chpass":
-        commands = __passwordCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "delhost":
-        commands = __delHost(ircMsg)
-    elif ircMsg.dataList[0].lower() == "deluser":
-        commands = __delCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "ident":
-        commands = __identCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "listusers":
-        commands = __listUsersCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "moduser":
-        commands = __modCmd(ircMsg)
-    elif ircMsg.dataList[0].lower() == "userinfo":
-        commands = __userInfo(ircMsg)
-
-    return commands
+def registerTriggers(channel, private):
+    '''Declares the triggers for user commands.'''
+    private.addCommand("init", __initTrigger)
+    private.addCommand("addhost", __addHost)
+    private.addCommand("adduser", __addCmd)
+    private.addCommand("chpass", __passwordCmd)
+    private.addCommand("delhost", __delHost)
+    private.addCommand("deluser", __delCmd)
+    private.addCommand("ident", __identCmd)
+    private.addCommand("listusers", __listUsersCmd)
+    private.addCommand("moduser", __modCmd)
+    private.addCommand("userinfo", __userInfo)
 
 def __addCmd(ircMsg):
     '''Execute the tasks for the special init command.'''
@@ -64,7 +50,7 @@ def __addCmd(ircMsg):
     dataList = ircMsg.dataList[:]
 
     if cmdLen > 1:
-        if ircMsg.dataList[1][0] == "#":
+        if ircMsg.net.isChannel(ircMsg.dataList[1]):
             cmdChannel = ircMsg.dataList[1]
             dataList.remove(cmdChannel)
 
@@ -118,7 +104,7 @@ def __addCmd(ircMsg):
                             # Erase the flags from the global permissions
                             # before adding the user to the database.
                             newUser.level = 0
-                            newUser.flags.approve = []
+                            newUser.flags.approved = []
                             newUser.flags.denied = []
 
                     # Need to make sure, if a user does not have access to
@@ -180,7 +166,7 @@ def __addHost(ircMsg):
     nick = ircMsg.net.findNick(ircMsg.src)
 
     if len(ircMsg.dataList) == 2:
-        if nick.auth:
+        if nick.authed:
             nick.user.hostmasks.append(ircMsg.dataList[1].lower())
             nick.user.hostmasks = list(set(nick.user.hostmasks))
             ircMsg.net.users.updateUser(nick.user)
@@ -342,7 +328,7 @@ def __delHost(ircMsg):
     host = ircMsg.dataList[1].lower()
 
     if len(ircMsg.dataList) == 2:
-        if nick.auth:
+        if nick.authed:
             if len(nick.user.hostmasks) > 1:
                 if host in nick.user.hostmasks:
                     nick.user.hostmasks.remove(host)
@@ -497,6 +483,13 @@ def __initCmd(ircMsg):
     return commands
 
 
+def __initTrigger(ircMsg):
+    '''The init command only exists while it is enabled.'''
+    if ircMsg.net.config.init > 0:
+        return __initCmd(ircMsg)
+    else:
+        return []
+
 def __levelBlock(level, nick, modUser, nickChannel = None, modChannel = None):
     '''Determines if level should block a user from access to a command.'''
     # When not looking to change someone's level, use -1 for level to disable
@@ -20,6 +20,8 @@ A place to store a users flags.
 from . import userLevels
 
 class UserFlags:
+    __slots__ = ("approved", "denied")
+
     def __init__(self):
         self.approved = []
         self.denied = []
@@ -28,7 +30,7 @@ class UserFlags:
         '''Checks to see if a user is approved for a flag.'''
         # Gant flags based on user level, but explicitly do not add them
         # to the database.
-        approved = self.approved[:] + userLevels.grantFlags(level)
+        approved = list(self.approved) + userLevels.grantFlags(level)
 
         if flag.lower() in self.denied:
             valid = False
@@ -94,4 +96,28 @@ class UserFlags:
 
         result = approvedString + ":" + deniedString
 
-        return result
\ No newline at end of file
+        return result
+
+class EmptyFlags(UserFlags):
+    '''
+    The flags of the empty user, none approved and none denied, which can not
+    be changed.
+    '''
+    __slots__ = ()
+
+    def __init__(self):
+        object.__setattr__(self, "approved", ())
+        object.__setattr__(self, "denied", ())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The empty user's flags can not be changed.")
+
+    def __delattr__(self, name):
+        raise AttributeError("The empty user's flags can not be changed.")
+
+    def cleanFlags(self):
+        '''There are no flags to clean.'''
+        pass
+
+    def toData(self, flags):
+        raise AttributeError("The empty user's flags can not be changed.")
@@ -24,9 +24,9 @@ import sqlite3
 import os.path
 import hashlib
 import base64
-import re
 
 from . import passwordTools
+from . import regexCache
 from .user import User
 
 class Users:
@@ -119,7 +119,7 @@ class Users:
             uid, masks = row
             maskList = masks.split(',')
             for mask in maskList:
-                if re.search(self.__convertWild(mask), hostmask, flags = re.IGNORECASE):
+                if regexCache.wildcard(mask).search(hostmask):
                     result = uid
                     break
             if not (result is None):
@@ -284,13 +284,6 @@ class Users:
         self.conn.close()
         self.conn = None
 
-    def __convertWild(self, search):
-        '''Converts a simple wildcard search into a regular expression.'''
-        new = search.replace('.', r"\.")
-        new = new.replace('?', ".?")
-        new = new.replace('*', ".*")
-        return new
-
     def __initDB(self):
         '''Intended to initialize a database that doesn't yet exist.'''
         self.__openDB()
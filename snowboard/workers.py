@@ -0,0 +1,192 @@
+# This file is part of snowboard.
+#
+# snowboard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# snowboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with snowboard.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Runs each configured network in a process of its own, so a busy network gets
+a core to itself instead of sharing one interpreter with the others.  The
+parent process restarts workers that die and collects the status each worker
+reports over a pipe.
+
+A group of channels can be given its own worker by moving it into its own
+[Network:...] section.
+
+See https://github.com/dwhagar/snowboard/wiki/Class-Docs for documentation.
+'''
+
+import multiprocessing
+import multiprocessing.connection
+import sys
+import time
+
+from . import debug
+from .logFile import LogFile
+from .network import Network
+
+def runWorker(cfg, runner, pipe):
+    '''Entry point of a worker process, runs a single network.'''
+    debug.logStd = LogFile(cfg.network, "debug")
+    debug.logErr = LogFile(cfg.network, "error")
+
+    net = Network(cfg)
+    net.statusPipe = pipe
+
+    try:
+        result = runner(net)
+    except KeyboardInterrupt:
+        result = 0
+
+    pipe.close()
+    sys.exit(result)
+
+class Worker:
+    '''The parent's view of a single worker process.'''
+    def __init__(self, cfg):
+        self.config = cfg
+        self.name = cfg.network
+        self.pipe = None
+        self.process = None
+        self.restarts = 0
+        self.restartAt = 0
+        self.restartDelay = 1
+        self.status = {}
+        self.finished = False
+
+class Workers:
+    def __init__(self, configs, runner):
+        self.runner = runner       # Function that drives one network
+        self.maxDelay = 60         # Longest wait before restarting a worker
+        self.reportInterval = 60   # How often to log the combined status
+        self.workers = []
+
+        for cfg in configs:
+            self.workers.append(Worker(cfg))
+
+    def run(self):
+        '''Start every worker and look after them until they have all quit.'''
+        debug.message("Starting " + str(len(self.workers)) + " worker processes.")
+
+        for worker in self.workers:
+            self.__start(worker)
+
+        reportNext = time.time() + self.reportInterval
+
+        try:
+            while not self.__allFinished():
+                self.__poll(1)
+
+                currentTime = time.time()
+                for worker in self.workers:
+                    if (not worker.finished) and worker.process is None and worker.restartAt <= currentTime:
+                        self.__start(worker)
+
+                if currentTime >= reportNext:
+                    self.report()
+                    reportNext = currentTime + self.reportInterval
+        except KeyboardInterrupt:
+            debug.message("Stopping all worker processes.")
+            for worker in self.workers:
+                if not worker.process is None:
+                    worker.process.terminate()
+                    worker.process.join()
+
+        return 0
+
+    def report(self):
+        '''Log the latest status reported by every worker.'''
+        for worker in self.workers:
+            if worker.finished:
+                state = "finished"
+            elif worker.process is None:
+                state = "waiting to restart"
+            elif worker.status.get("ready"):
+                state = "ready"
+            elif worker.status.get("online"):
+                state = "connecting"
+            else:
+                state = "offline"
+
+            debug.message("Worker " + worker.name + " is " + state + ", " +
+                          str(worker.status.get("channels", 0)) + " channels, " +
+                          str(worker.status.get("nicks", 0)) + " nicks, " +
+                          str(worker.status.get("queue", 0)) + " queued, " +
+                          str(worker.restarts) + " restarts.")
+
+    def __allFinished(self):
+        '''Checks if every worker has quit for good.'''
+        for worker in self.workers:
+            if not worker.finished:
+                return False
+
+        return True
+
+    def __exited(self, worker):
+        '''Deal with a worker process that has gone away.'''
+        worker.process.join()
+        code = worker.process.exitcode
+        worker.process = None
+
+        if not worker.pipe is None:
+            worker.pipe.close()
+            worker.pipe = None
+
+        if code == 0:
+            debug.message("Worker " + worker.name + " has quit.")
+            worker.finished = True
+        else:
+            # Back off, so a worker that keeps dying does not spin.
+            debug.error("Worker " + worker.name + " died with exit code " + str(code) + ", restarting in " + str(worker.restartDelay) + " seconds.")
+            worker.restarts += 1
+            worker.restartAt = time.time() + worker.restartDelay
+            worker.restartDelay = min(worker.restartDelay * 2, self.maxDelay)
+
+    def __poll(self, timeout):
+        '''Wait for status reports or for workers to exit.'''
+        waitOn = {}
+        for worker in self.workers:
+            if not worker.process is None:
+                waitOn[worker.pipe] = worker
+                waitOn[worker.process.sentinel] = worker
+
+        if len(waitOn) == 0:
+            time.sleep(timeout)
+            return
+
+        for ready in multiprocessing.connection.wait(list(waitOn), timeout):
+            worker = waitOn[ready]
+            if worker.process is None:
+                continue
+
+            if ready is worker.pipe:
+                try:
+                    worker.status = worker.pipe.recv()
+                    # A worker that reports ready again has recovered.
+                    if worker.status.get("ready"):
+                        worker.restartDelay = 1
+                except (EOFError, OSError):
+                    self.__exited(worker)
+            else:
+                self.__exited(worker)
+
+    def __start(self, worker):
+        '''Start, or restart, the process for a worker.'''
+        parentPipe, childPipe = multiprocessing.Pipe(duplex = False)
+
+        worker.pipe = parentPipe
+        worker.process = multiprocessing.Process(target = runWorker, name = "snowboard-" + worker.name,
+                                                 args = (worker.config, self.runner, childPipe))
+        worker.process.start()
+        childPipe.close()
+
+        debug.message("Started worker " + worker.name + " as process " + str(worker.process.pid) + ".")